@@ -1,53 +1,80 @@
 import random
-from math import pi, sin, cos, sqrt
+from math import pi
 
 import engine_main
 import engine
-import engine_io
 import engine_draw
 import engine_save
 
 from engine_draw import Color
 from engine_animation import Delay
-from engine_resources import TextureResource
 from engine_math import Vector2
 from engine_nodes import Sprite2DNode, Rectangle2DNode, Circle2DNode, CameraNode, Text2DNode
 
+from governor import FrameGovernor
+from inputqueue import InputQueue
+from fixed import ONE, Body, to_fixed, to_px, mul, quot, clamp, trig_table
+from kernels import Buffer, first_circle_hit, first_circle_pair
+from textures import load as load_texture
+from telemetry import Telemetry, ASTEROIDS
+import nodeaudit
+from hud import Counter
+
 ACCELERATION = 17 # Lower number is faster acceleration
 TOP_SPEED = 1.5 # Top speed in pixels/frame
 ROT_SPEED = 25 # Rotation speed; Lower is faster
 BULLET_SPEED = 2.5 # Bullet speed in pixels/frame
+TELEMETRY = None # Per-frame telemetry: None, "usb" or a file path, see lib/telemetry.py
+
+# Kinematics run in Q8.8 fixed point, see lib/fixed.py
+COS, SIN = trig_table(2 * ROT_SPEED) # One entry per rotation step
+MAX_VELOCITY = to_fixed(TOP_SPEED)
+BULLET_VELOCITY = to_fixed(BULLET_SPEED)
+SCREEN_EDGE = 63 * ONE
+WRAP_EDGE = 64 * ONE
+
+SHIELD_ON = Color(0, 0, 1)
+SHIELD_OFF = Color(0, 0, 0)
+
+# Loaded once and reused by every new ship
+ship_texture, _ = load_texture("/Games/Asteroids/spaceship.bmp")
 
 engine_save.set_location("highscore.data")
 
 menu = False
 score = 0
-highscore = engine_save.load("highscore", 0)
+highscore = int(engine_save.load("highscore", 0)) # Older saves could hold a float
 
 camera = CameraNode()
 engine.fps_limit(25)
 
+# Optional load is cut back when frames run over the 40ms budget
+governor = FrameGovernor(engine.tick, budget_ms=40)
+governor.add_knob("meteroids", 20, 10) # Cap on live meteroids
+governor.add_knob("bullets", 32, 6) # Cap on live bullets (below 256, see kernels.py)
+
+inputs = InputQueue()
+telemetry = Telemetry(TELEMETRY, ASTEROIDS)
+
 class Bullet:
-    def __init__(self, pos, angle):
-        self.angle = angle
+    def __init__(self, x, y, heading):
         self.active = True
-        self.sprite = Rectangle2DNode(position=pos, 
-                                      rotation=self.angle,
+        self.body = Body(x, y, mul(COS[heading], BULLET_VELOCITY),
+                         -mul(SIN[heading], BULLET_VELOCITY))
+        self.sprite = Rectangle2DNode(position=Vector2(to_px(x), to_px(y)), 
+                                      rotation=heading * pi / ROT_SPEED,
                                       height=2, width=2,
                                       layer=1)
 
     def move(self):
-        self.sprite.position.x += BULLET_SPEED * cos(2*pi-self.angle)
-        self.sprite.position.y += BULLET_SPEED * sin(2*pi-self.angle)
+        self.body.step()
+        self.body.write(self.sprite)
 
     def is_offscreen(self):
         if not self.active:
             self.sprite.mark_destroy()
             return True
-        if abs(self.sprite.position.x) > 63:
-            self.sprite.mark_destroy()
-            return True
-        elif abs(self.sprite.position.y) > 63:
+        if self.body.outside(SCREEN_EDGE):
             self.sprite.mark_destroy()
             return True
         else:
@@ -56,45 +83,36 @@ class Bullet:
 class Player:
     def __init__(self):
         self.sprite = Sprite2DNode(Vector2(0, 0),
-                                   TextureResource("/Games/Asteroids/spaceship.bmp"),
+                                   ship_texture,
                                    layer=1)
         #self.sprite = Rectangle2DNode(Vector2(0, 0), 7, 7, layer=1)
         self.shield_sprite = Circle2DNode(Vector2(0, 0), 7,
-                                          layer=0, outline=True, color=Color(0, 0, 1))
+                                          layer=0, outline=True, color=SHIELD_ON)
 
         self.shield = False
-        self.x_momentum = 0
-        self.y_momentum = 0
-        self.angle = 0
+        self.body = Body() # Velocity is in screen space, so +y is down
+        self.heading = 0 # Steps of pi/ROT_SPEED
         self.bullets = []
 
     def rotate(self, direction):
-        self.angle += direction * (pi / ROT_SPEED)
-        self.angle = self.angle % (2 * pi)
-        self.sprite.rotation = self.angle
+        self.heading = (self.heading + direction) % (2 * ROT_SPEED)
+        self.sprite.rotation = self.heading * pi / ROT_SPEED
 
     def thrust(self):
-        self.x_momentum = max(min(self.x_momentum + cos(self.angle)/ACCELERATION, TOP_SPEED), -TOP_SPEED)
-        self.y_momentum = max(min(self.y_momentum + sin(self.angle)/ACCELERATION, TOP_SPEED), -TOP_SPEED)
+        self.body.vx = clamp(self.body.vx + quot(COS[self.heading], ACCELERATION), MAX_VELOCITY)
+        self.body.vy = clamp(self.body.vy - quot(SIN[self.heading], ACCELERATION), MAX_VELOCITY)
 
     def move(self):
-        self.sprite.position.x += self.x_momentum
-        self.sprite.position.y -= self.y_momentum
+        self.body.step()
         # Screenwrap
-        if self.sprite.position.x >= 64:
-            self.sprite.position.x = -63
-        elif self.sprite.position.x <= -64:
-            self.sprite.position.x = 63
-        if self.sprite.position.y >= 64:
-            self.sprite.position.y = -63
-        elif self.sprite.position.y <= -64:
-            self.sprite.position.y = 63
+        self.body.wrap(WRAP_EDGE, SCREEN_EDGE)
+        self.body.write(self.sprite)
         
         self.shield_sprite.position = self.sprite.position
         if self.shield:
-            self.shield_sprite.color = Color(0, 0, 1)
+            self.shield_sprite.color = SHIELD_ON
         else:
-            self.shield_sprite.color = Color(0, 0, 0)
+            self.shield_sprite.color = SHIELD_OFF
 
     def move_bullets(self):
         self.bullets = [b for b in self.bullets
@@ -104,9 +122,9 @@ class Player:
             bullet.move()
 
     def shoot(self):
-        x = self.sprite.position.x
-        y = self.sprite.position.y
-        self.bullets.append(Bullet(Vector2(x, y), self.angle))
+        if len(self.bullets) >= governor.limit("bullets"):
+            return
+        self.bullets.append(Bullet(self.body.x, self.body.y, self.heading))
 
     def toggle_shield(self, onoff):
         self.shield = onoff
@@ -130,15 +148,18 @@ class Meteroid():
         rand_axis = random.randint(0, 1)
         pos[rand_axis] = random.uniform(-63, 63)
         pos[not rand_axis] = random.choice([-63, 63])
-        self.sprite.position = Vector2(pos[0], pos[1])
+        self.body = Body(to_fixed(pos[0]), to_fixed(pos[1]))
+        self.sprite.position = Vector2(to_px(self.body.x), to_px(self.body.y))
 
         self.slopes = [random.randint(1, 4), random.randint(1, 4)]
         self.slopes[0] *= int(pos[0] < 0) * 2 - 1
         self.slopes[1] *= int(pos[1] < 0) * 2 - 1
 
     def move(self):
-        self.sprite.position.x += self.slopes[0] / (8 - min(score//100, 3))
-        self.sprite.position.y += self.slopes[1] / (8 - min(score//100, 3))
+        divisor = 8 - min(score//100, 3)
+        self.body.x += quot(self.slopes[0] * ONE, divisor)
+        self.body.y += quot(self.slopes[1] * ONE, divisor)
+        self.body.write(self.sprite)
 
     def get_points_value(self):
         return (10 - self.sprite.radius) * 10
@@ -146,12 +167,14 @@ class Meteroid():
     def explode(self):
         self.sprite.radius -= 2
         self.slopes = [random.randint(1, 4), random.randint(1, 4)]
-        self.slopes[0] *= int(self.sprite.position.x < 0) * 2 - 1
-        self.slopes[1] *= int(self.sprite.position.y < 0) * 2 - 1
+        self.slopes[0] *= int(self.body.x < 0) * 2 - 1
+        self.slopes[1] *= int(self.body.y < 0) * 2 - 1
 
         if self.sprite.radius > 0:
             clone = Meteroid(self.sprite.radius)
-            clone.sprite.position = self.sprite.position
+            clone.body.x = self.body.x
+            clone.body.y = self.body.y
+            clone.body.write(clone.sprite)
             return clone
         return False
 
@@ -159,10 +182,7 @@ class Meteroid():
         if self.sprite.radius <= 0:
             self.sprite.mark_destroy()
             return True
-        elif abs(self.sprite.position.x) > 63:
-            self.sprite.mark_destroy()
-            return True
-        elif abs(self.sprite.position.y) > 63:
+        elif self.body.outside(SCREEN_EDGE):
             self.sprite.mark_destroy()
             return True
         else:
@@ -174,7 +194,7 @@ class Space:
 
     def manage_meteroids(self):
         # Add new meteroids
-        if len(self.meteroids) <= min(score // 200 + 7, 20):
+        if len(self.meteroids) <= min(score // 200 + 7, governor.limit("meteroids")):
             size = random.choice([2, 4, 4, 6, 6, 6, 8])
             self.meteroids.append(Meteroid(size))
 
@@ -196,75 +216,85 @@ class Space:
             m.sprite.mark_destroy()
 
 
+# Reused every frame to hand positions to the collision kernels
+meteroid_x, meteroid_y, meteroid_r = Buffer(), Buffer(), Buffer()
+bullet_x, bullet_y = Buffer(), Buffer()
+
 def check_collisions(game, player):
     global score
+    n = len(game.meteroids)
+    mx, my, mr = meteroid_x.reserve(n), meteroid_y.reserve(n), meteroid_r.reserve(n)
+    for i, meteroid in enumerate(game.meteroids):
+        mx[i] = meteroid.body.x
+        my[i] = meteroid.body.y
+        mr[i] = meteroid.sprite.radius * ONE
+
     # Check for collision between player and meteroid
-    player_xy = [player.sprite.position.x,
-                 player.sprite.position.y]
-    for meteroid in game.meteroids:
-        meter_xy = [meteroid.sprite.position.x,
-                    meteroid.sprite.position.y]
-        ab = [meter_xy[0] - player_xy[0],
-             meter_xy[1] - player_xy[1]]
-        distance = sqrt( ab[0]**2 + ab[1]**2 )
-        if distance < meteroid.sprite.radius:
-            if not player.shield:
-                return {"happened":True, "what":-1}
+    if not player.shield:
+        if first_circle_hit(player.body.x, player.body.y, mx, my, mr, n) >= 0:
+            return {"happened":True, "what":-1}
+
     # Check for collision between bullet and meteroid
-    for meteroid in game.meteroids:
-        for bullet in player.bullets:
-            bullet_xy = [bullet.sprite.position.x,
-                         bullet.sprite.position.y]
-            meter_xy = [meteroid.sprite.position.x,
-                        meteroid.sprite.position.y]
-            ab = [meter_xy[0] - bullet_xy[0],
-                 meter_xy[1] - bullet_xy[1]]
-            distance = sqrt( ab[0]**2 + ab[1]**2 )
-            if distance < meteroid.sprite.radius:
-                game.split_meteroid(meteroid)
-                bullet.active = False
-                return {"happened":True,
-                        "what":meteroid.get_points_value()}
+    m = len(player.bullets)
+    bx, by = bullet_x.reserve(m), bullet_y.reserve(m)
+    for j, bullet in enumerate(player.bullets):
+        bx[j] = bullet.body.x
+        by[j] = bullet.body.y
+    hit = first_circle_pair(mx, my, mr, n, bx, by, m)
+    if hit >= 0:
+        meteroid = game.meteroids[hit >> 8]
+        game.split_meteroid(meteroid)
+        player.bullets[hit & 0xff].active = False
+        return {"happened":True,
+                "what":meteroid.get_points_value()}
     return {"happened":False, "what":0}
 
 
 game = Space()
 player = Player()
-scoreboard = Text2DNode(position=Vector2(50, -56), layer=4,
-                        text=f"{score}",
+score_counter = Counter(Vector2(58, -56), 5)
+score_counter.set(score)
+# Menu and pause messages, only written when the menu opens
+scoreboard = Text2DNode(position=Vector2(0, 0), layer=4, text="",
                         letter_spacing=1.1, line_spacing=1.3)
 
 game_running = True
 paused = False
 while game_running:
-    if engine.tick():
+    if governor.tick():
+        inputs.update()
+        telemetry.begin(governor.last_us)
         if menu:
-            if engine_io.A.is_just_pressed:
-                score = 0
+            if inputs.pressed("A"):
                 if not paused:
+                    nodeaudit.state("play")
+                    score = 0
                     game = Space()
                     player = Player()
                 
-                scoreboard.position = Vector2(50, -56)
-                scoreboard.text = f"{score}"
+                scoreboard.text = ""
+                score_counter.set(score)
 
                 menu = False
                 paused = False
 
-            if engine_io.MENU.is_just_pressed:
+            if inputs.pressed("MENU"):
                 game_running = False
         else:
             game.manage_meteroids()
             player.move()
             player.move_bullets()
+            telemetry.phase(0) # Movement
+            telemetry.count(0, len(game.meteroids))
+            telemetry.count(1, len(player.bullets))
             if player.shield and score <= 0:
                 player.toggle_shield(False)
           
             if player.shield:
-                score = max(score-1.5, 0)
-                scoreboard.text = f"{score}"
+                score = max(score - 1 - (governor.frame & 1), 0) # 1.5 a frame, in whole points
             
             collisions = check_collisions(game, player)
+            telemetry.phase(1) # Collisions
             if collisions["happened"]:
                 if collisions["what"] == -1:
                     # Clear the game
@@ -276,36 +306,44 @@ while game_running:
                     player.sprite.mark_destroy()
                     player.shield_sprite.mark_destroy()
                   
-                    scoreboard.position = Vector2(0, 0)
+                    score_counter.hide()
                     scoreboard.text = f"Your score was: {score}\nHighscore: {highscore}\nPress A to restart."
                   
+                    nodeaudit.state("menu")
                     menu = True
+                    continue
                 else:
                     score += collisions["what"]
-                    scoreboard.text = f"{score}"
-                continue
+            score_counter.set(score)
 
-            if engine_io.LEFT.is_pressed or engine_io.LB.is_pressed:
+            if inputs.held("LEFT") or inputs.held("LB"):
                 player.rotate(1)
-            if engine_io.RIGHT.is_pressed or engine_io.RB.is_pressed:
+            if inputs.held("RIGHT") or inputs.held("RB"):
                 player.rotate(-1)
 
-            if engine_io.UP.is_pressed:
+            if inputs.held("UP"):
                 player.thrust()
 
-            if engine_io.A.is_just_pressed:
-                player.shoot()
-            if engine_io.B.is_just_pressed:
-                if score > 0:
-                    player.toggle_shield(True)
-            elif engine_io.B.is_just_released:
-                player.toggle_shield(False)
-
-            if engine_io.MENU.is_just_pressed:
+            # Every press since the last frame, in order, so quick taps aren't merged
+            for name, pressed in inputs.events:
+                if name == "A" and pressed:
+                    player.shoot()
+                elif name == "B":
+                    if pressed:
+                        if score > 0:
+                            player.toggle_shield(True)
+                    else:
+                        player.toggle_shield(False)
+            telemetry.phase(2) # Input
+
+            if inputs.pressed("MENU"):
                 menu = True
                 paused = True
-                scoreboard.position=Vector2(0, 0)
+                score_counter.hide()
                 scoreboard.text = "Paused\nPress A to resume"
                 continue
 
 engine_save.save("highscore", highscore)
+telemetry.close()
+inputs.close()
+print(inputs.report())
@@ -1,18 +1,34 @@
 import engine_main
 import engine
-import engine_io
 import random
+from array import array
 import engine_draw
 from engine_draw import Color
 from engine_animation import Delay
 from engine_math import Vector2
 from engine_nodes import Rectangle2DNode, CameraNode, Text2DNode
+from governor import FrameGovernor
+from inputqueue import InputQueue
+from kernels import swap_block
+from telemetry import Telemetry, BITFLIP
+import nodeaudit
+from hud import Label
 
-GRID_SIZE = 8
-TILE_SIZE = 128 / GRID_SIZE
+SIZES = (8, 12, 16, 24, 32) # Board sizes to pick from in the menu
+VIEW = 8 # Cells across the screen
+TILE_SIZE = 128 / VIEW
+
+COLORS = [engine_draw.red, engine_draw.blue,
+          engine_draw.green, engine_draw.purple,
+          engine_draw.yellow, engine_draw.darkgrey,
+          engine_draw.silver, engine_draw.brown,
+          engine_draw.orange, engine_draw.skyblue]
+
+TELEMETRY = None # Per-frame telemetry: None, "usb" or a file path, see lib/telemetry.py
 
 depth = 2 # Number of swaps till back to original
 level = 15
+board_size = SIZES[0]
 
 camera = CameraNode()
 
@@ -32,7 +48,7 @@ class Crosshair:
         self.update_corners()
 
     def update_corners(self):
-        half = int(GRID_SIZE / 2)
+        half = int(VIEW / 2)
         pos1 = Vector2((self.pos[0]-half)*TILE_SIZE+2,
                        (self.pos[1]-half)*TILE_SIZE+2)
         pos2 = Vector2((self.pos[0]-half)*TILE_SIZE+TILE_SIZE-2,
@@ -61,22 +77,8 @@ class Tile(Rectangle2DNode):
         self.outline = False
         self.layer = 1
 
-        self.tile_type = 0
-
-    def swap(self, forward):
-        if forward:
-            self.tile_type = (self.tile_type+1) % depth
-        else:
-            if self.tile_type == 0: 
-                self.tile_type = depth-1
-            else: 
-                self.tile_type = self.tile_type-1
-        colors = [engine_draw.red, engine_draw.blue,
-                  engine_draw.green, engine_draw.purple,
-                  engine_draw.yellow, engine_draw.darkgrey,
-                  engine_draw.silver, engine_draw.brown,
-                  engine_draw.orange, engine_draw.skyblue]
-        self.color = colors[self.tile_type]
+    def show(self, tile_type):
+        self.color = COLORS[tile_type]
 
     def select(self, selected):
         if selected:
@@ -86,22 +88,60 @@ class Tile(Rectangle2DNode):
 
 class Grid:
     def __init__(self):
-        halfway = int(GRID_SIZE/2)
-        self.tiles = [[] for _ in range(GRID_SIZE)]
-        for x in range(GRID_SIZE):
-            for y in range(GRID_SIZE):
+        halfway = int(VIEW/2)
+        # Nodes only for the cells on screen, the board scrolls under them
+        self.tiles = [[] for _ in range(VIEW)]
+        for x in range(VIEW):
+            for y in range(VIEW):
                 new_pos = Vector2(TILE_SIZE*(x-halfway+0.5),
                                   TILE_SIZE*(y-halfway+0.5))
                 self.tiles[x].append(Tile(new_pos))
         self.selector = Crosshair()
-        self.selected = [halfway, halfway]
-        self.selector.move_to(self.selected)
-        self.tiles[self.selected[0]][self.selected[1]].select(True)
+        self.lit = self.tiles[0][0] # Tile under the crosshair
+        self.resize(board_size)
+
+    def resize(self, size):
+        self.size = size
+        self.cells = bytearray(size*size) # Tile types, cell (x, y) at x*size+y
+        self.unsolved = 0 # Number of cells that aren't red, kept up to date by swap()
+        self.view = [0, 0] # Board cell shown in the top left tile
+        self.selected = [int(size/2), int(size/2)]
+        self.scroll()
+        self.refresh()
+
+    def scroll(self):
+        # Keep the selection and the block around it on screen, returns
+        # True if the view moved
+        moved = False
+        for axis in range(2):
+            v = self.view[axis]
+            s = self.selected[axis]
+            if s - v < 1:
+                v = s - 1
+            elif s - v > VIEW - 2:
+                v = s - VIEW + 2
+            v = max(0, min(v, self.size - VIEW))
+            if v != self.view[axis]:
+                self.view[axis] = v
+                moved = True
+        self.lit.select(False)
+        self.lit = self.tiles[self.selected[0]-self.view[0]][self.selected[1]-self.view[1]]
+        self.lit.select(True)
+        self.selector.move_to([self.selected[0]-self.view[0],
+                               self.selected[1]-self.view[1]])
+        return moved
+
+    def refresh(self):
+        vx, vy = self.view
+        for x in range(VIEW):
+            column = (vx+x)*self.size + vy
+            for y in range(VIEW):
+                self.tiles[x][y].show(self.cells[column+y])
 
     def is_valid_swap(self, x, y):
-        if x < 0 or x > GRID_SIZE-1:
+        if x < 0 or x > self.size-1:
             return False
-        if y < 0 or y > GRID_SIZE-1:
+        if y < 0 or y > self.size-1:
             return False
         return True
 
@@ -110,47 +150,50 @@ class Grid:
             sx, sy = self.selected
         if not self.is_valid_swap(sx, sy):
             return False
-        affected = [[sx-1, sy-1], [sx, sy-1], [sx+1, sy-1],
-                    [sx-1, sy  ], [sx, sy  ], [sx+1, sy  ],
-                    [sx-1, sy+1], [sx, sy+1], [sx+1, sy+1]]
-        for x, y in affected:
-            if self.is_valid_swap(x, y):
-                self.tiles[x][y].swap(direction==1)
+        self.unsolved += swap_block(self.cells, self.size, sx, sy,
+                                    int(direction == 1), depth)
+        vx, vy = self.view
+        for x in range(max(sx-1, vx), min(sx+2, vx+VIEW)):
+            for y in range(max(sy-1, vy), min(sy+2, vy+VIEW)):
+                self.tiles[x-vx][y-vy].show(self.cells[x*self.size+y])
         return True
 
     def mix(self):
-        all_positions = [(x, y) for x in range(GRID_SIZE) for y in range(GRID_SIZE)]
-        for i in range(level):
-            rand_index = int(random.random() * len(all_positions))
-            self.swap(all_positions[rand_index][0], all_positions[rand_index][1])
-            all_positions.pop(rand_index)
+        # level distinct cells, picked by a partial shuffle of the cell indices
+        cells = self.size * self.size
+        order = array("H", range(cells))
+        for i in range(min(level, cells)):
+            pick = i + int(random.random() * (cells - i))
+            order[i], order[pick] = order[pick], order[i]
+            self.swap(order[i] // self.size, order[i] % self.size)
 
     def move_selection(self, delta_x, delta_y):
         if not self.is_valid_swap(self.selected[0]+delta_x,
                                   self.selected[1]+delta_y):
             return
-        self.tiles[self.selected[0]][self.selected[1]].select(False)        
         self.selected[0] += delta_x
         self.selected[1] += delta_y
-        self.tiles[self.selected[0]][self.selected[1]].select(True)
-        self.selector.move_to(self.selected)
+        if self.scroll():
+            self.refresh()
 
     def check_win(self):
-        for row in self.tiles:
-            for tile in row:
-                if tile.tile_type != 0:
-                    return False
-        return True
+        return self.unsolved == 0
 
 class Menu:
     def __init__(self):
         self.active = True
 
-        level_str = "Level: "+str(level)
-        depth_str = "Depth: "+str(depth)
         self.texts = [Text2DNode(text="BitFlip", color=engine_draw.red),
-                      Text2DNode(text=level_str, color=engine_draw.white),
-                      Text2DNode(text=depth_str, color=engine_draw.white,)]
+                      Text2DNode(color=engine_draw.white),
+                      Text2DNode(color=engine_draw.white,),
+                      Text2DNode(color=engine_draw.white)]
+        # Redrawn only when the number changes, not on every press at a limit
+        self.level_text = Label(self.texts[1], "Level: {}")
+        self.depth_text = Label(self.texts[2], "Depth: {}")
+        self.size_text = Label(self.texts[3], "Size: {}x{}")
+        self.level_text.set(level)
+        self.depth_text.set(depth)
+        self.size_text.set(board_size, board_size)
         for i, text_item in enumerate(self.texts):
             text_item.layer = 4
             text_item.letter_spacing = 1.5            
@@ -176,51 +219,80 @@ class Menu:
 
     def set_difficulty(self, d):
         global level
-        level = max(1, min(GRID_SIZE*GRID_SIZE, d))
-        level_str = "Level: "+str(level)
-        self.texts[1].text = level_str
+        level = max(1, min(board_size*board_size, d))
+        self.level_text.set(level)
 
     def set_depth(self, d):
         global depth
         depth = max(2, min(d, 10))
-        depth_str = "Depth: "+str(depth)
-        self.texts[2].text = depth_str
+        self.depth_text.set(depth)
+
+    def next_size(self):
+        global board_size
+        board_size = SIZES[(SIZES.index(board_size) + 1) % len(SIZES)]
+        self.size_text.set(board_size, board_size)
+        self.set_difficulty(level) # The cap on mixing swaps follows the board
 
 mainloop = True
+won = False
 menu = Menu()
+governor = FrameGovernor(engine.tick) # No knobs, only measures each frame's cost
+inputs = InputQueue()
+telemetry = Telemetry(TELEMETRY, BITFLIP)
 
 game = Grid()
 while mainloop:
-    if engine.tick():
+    if governor.tick():
+        inputs.update()
+        telemetry.begin(governor.last_us)
         if menu.active:
-            if engine_io.LEFT.is_just_pressed:
-                menu.set_depth(depth-1)
-            if engine_io.RIGHT.is_just_pressed:
-                menu.set_depth(depth+1)
-            if engine_io.UP.is_just_pressed:
-                menu.set_difficulty(level+1)
-            if engine_io.DOWN.is_just_pressed:
-                menu.set_difficulty(level-1)
-            if engine_io.MENU.is_just_pressed:
+            for name in inputs.presses:
+                if name == "LEFT":
+                    menu.set_depth(depth-1)
+                elif name == "RIGHT":
+                    menu.set_depth(depth+1)
+                elif name == "UP":
+                    menu.set_difficulty(level+1)
+                elif name == "DOWN":
+                    menu.set_difficulty(level-1)
+                elif name == "B":
+                    menu.next_size()
+            if inputs.pressed("MENU"):
                 mainloop = False
-            if engine_io.A.is_just_pressed:
+            if inputs.pressed("A"):
+                nodeaudit.state("play")
+                won = False
+                if game.size != board_size:
+                    game.resize(board_size)
                 game.mix()
                 menu.activate(False)
             continue
         else:
-            if engine_io.LEFT.is_just_pressed:
-                game.move_selection(-1, 0)
-            if engine_io.RIGHT.is_just_pressed:
-                game.move_selection(1, 0)
-            if engine_io.UP.is_just_pressed:
-                game.move_selection(0, -1)
-            if engine_io.DOWN.is_just_pressed:
-                game.move_selection(0, 1)
-            if engine_io.A.is_just_pressed:
-                game.swap(None, None)
-            if engine_io.B.is_just_pressed:
-                game.swap(None, None, direction=-1)
-            if engine_io.MENU.is_just_pressed:
+            # Every press since the last frame, in order, so quick taps aren't merged
+            for name in inputs.presses:
+                if name == "LEFT":
+                    game.move_selection(-1, 0)
+                elif name == "RIGHT":
+                    game.move_selection(1, 0)
+                elif name == "UP":
+                    game.move_selection(0, -1)
+                elif name == "DOWN":
+                    game.move_selection(0, 1)
+                elif name == "A":
+                    game.swap(None, None)
+                elif name == "B":
+                    game.swap(None, None, direction=-1)
+            if inputs.pressed("MENU"):
+                nodeaudit.state("menu")
                 menu.activate(True)
-            if game.check_win():
+            telemetry.phase(0) # Input and swaps
+            telemetry.count(0, game.unsolved)
+            if game.check_win() and not won:
+                # One delay per win, not one per frame until the menu opens
+                won = True
+                nodeaudit.state("menu")
                 Delay().start(1000, menu.activate)
+
+telemetry.close()
+inputs.close()
+print(inputs.report())
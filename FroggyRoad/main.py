@@ -10,13 +10,30 @@ import engine_save
 from engine_draw import Color
 from engine_animation import Delay
 from engine_math import Vector2
-from engine_resources import TextureResource
 from engine_nodes import Rectangle2DNode, CameraNode, Text2DNode, Sprite2DNode
 
+from governor import FrameGovernor
+from inputqueue import InputQueue
+from fixed import ONE, to_fixed, to_px
+from kernels import Buffer, first_overlap, first_inside
+from scheduler import WorkScheduler
+from stats import Histogram
+from textures import load as load_texture
+from telemetry import Telemetry, FROGGYROAD
+import nodeaudit
+from hud import Counter, Label
+
 GRASS_COLOR = Color(0.75, 0, 0.75)
 STREET_COLOR = Color(0.15, 0.15, 0.15)
 RIVER_COLOR = Color(0.075, 0, 0.5)
 
+# Horizontal positions and speeds are Q8.8 fixed point, see lib/fixed.py
+SCREEN_EDGE = 64 * ONE
+HOP = 8 * ONE
+HOP_LIMIT = 56 * ONE
+
+TELEMETRY = None # Per-frame telemetry: None, "usb" or a file path, see lib/telemetry.py
+
 engine_save.set_location("save.data")
 
 world = engine_save.load("world", 1) # Used for the random generator seed
@@ -35,33 +52,69 @@ rumble_clock = 0
 camera = CameraNode()
 engine.fps_limit(25)
 
+# Optional load is cut back when frames run over the 40ms budget
+governor = FrameGovernor(engine.tick, budget_ms=40)
+governor.add_knob("lane_objects", 6, 3) # Cap on live objects per lane
+
+inputs = InputQueue()
+moves = [] # Buffered hops, one is played per frame so every lane gets checked
+telemetry = Telemetry(TELEMETRY, FROGGYROAD)
+
+# Lane building and teardown is spread over frames so hopping forward doesn't spike
+scheduler = WorkScheduler(budget_us=3000)
+staged = None # The next lane, built ahead of time just above the screen
+
+# Frame cost in ms, split by whether the frame moved the road forward
+FRAME_EDGES = (5, 10, 15, 20, 25, 30, 35, 40, 50, 60, 80)
+advance_frames = Histogram(FRAME_EDGES)
+other_frames = Histogram(FRAME_EDGES)
+advanced = False
+
+# Every sprite of a kind shares one texture, loaded the first time it's needed.
+# Baked textures (tools/bake_assets.py) carry their own transparent colour,
+# plain BMPs are keyed on white.
+textures = {}
+
+def texture(path):
+    if path not in textures:
+        textures[path] = load_texture(path, Color(1, 1, 1))
+    return textures[path]
+
 
 class Player:
     def __init__(self):
-        sprite_resource = TextureResource("/Games/FroggyRoad/frog.bmp")
+        sprite_resource, key = texture("/Games/FroggyRoad/frog.bmp")
         self.sprite = Sprite2DNode(Vector2(0, 24),
                                    sprite_resource,
-                                   transparent_color=Color(1, 1, 1),
+                                   transparent_color=key,
                                    rotation=0, layer=3)
         #self.sprite = Rectangle2DNode(position=Vector2(0, 24), rotation=pi/2,
         #                              height=10, width=10, layer=3)
+        self.x = 0
 
     def move(self, direction):
-        xpos = self.sprite.position.x
-        self.sprite.position.x = max(min(xpos + direction * 8, 56), -56)
+        self.x = max(min(self.x + direction * HOP, HOP_LIMIT), -HOP_LIMIT)
+        self.sprite.position.x = to_px(self.x)
 
         if direction == -1: self.sprite.rotation = pi/2
         elif direction == 1: self.sprite.rotation = -(pi/2)
 
+    def drift(self, speed):
+        # Carried along by a log or lily pad
+        self.x += speed
+        self.sprite.position.x = to_px(self.x)
+
 
 class MovingObject:
     def __init__(self, speed, sprite_file):
-        self.speed = speed
+        self.speed = speed # Fixed point
         self.moved = False
+        self.x = 0
 
+        sprite_resource, key = texture(sprite_file)
         self.sprite = Sprite2DNode(Vector2(0, 0),
-                                   TextureResource(sprite_file),
-                                   transparent_color=Color(1, 1, 1),
+                                   sprite_resource,
+                                   transparent_color=key,
                                    layer=2)
         #self.sprite = Rectangle2DNode(height=6, width=10, layer=2)
         #self.sprite.position = Vector2(0, 0)
@@ -69,11 +122,12 @@ class MovingObject:
     def move(self, direction):
         if self.moved == False:
             self.moved = True
-            self.sprite.position.x = -64 * direction
-        self.sprite.position.x += self.speed * direction
+            self.x = -SCREEN_EDGE * direction
+        self.x += self.speed * direction
+        self.sprite.position.x = to_px(self.x)
 
     def offscreen(self):
-        return (abs(self.sprite.position.x) > 64)
+        return self.x > SCREEN_EDGE or self.x < -SCREEN_EDGE
     
     def adjust_y(self, new_y):
         self.sprite.position.y = new_y
@@ -82,22 +136,25 @@ class Car(MovingObject):
     def __init__(self, speed):
         super().__init__(speed, "/Games/FroggyRoad/car.bmp")
         self.width = 10
+        self.half_width = 5 * ONE
 
 class Log(MovingObject):
     def __init__(self, speed):
         super().__init__(speed, "/Games/FroggyRoad/log.bmp")
         self.width = 25
+        self.half_width = 25 * ONE // 2
 
 class Lily(MovingObject):
     def __init__(self, speed):
         super().__init__(speed, "/Games/FroggyRoad/lily.bmp")
         self.width = 10
+        self.half_width = 5 * ONE
 
 
 class Lane:
     def __init__(self, speed, direction, spawn_rate, lane_type):
         self.ltype = lane_type
-        self.speed = speed
+        self.speed = to_fixed(speed)
         self.direction = direction
         
         self.spawn_rate = spawn_rate
@@ -131,6 +188,8 @@ class Lane:
             if self.skip_spawn_timer < self.skip_spawn:
                 if self.ltype == 0:
                     pass
+                elif len(self.objects) >= governor.limit("lane_objects"):
+                    pass # Over budget, skip this spawn
                 elif self.ltype == 1:
                     self.objects.append(Car(self.speed))
                 elif self.ltype == 2:
@@ -237,63 +296,78 @@ def get_next_lane(score):
             last_river_direction = -1
         return RiverLog(speed, direction, spawn_rate)
 
+# Reused every frame to hand object extents to the collision kernels
+object_lefts, object_rights = Buffer(), Buffer()
+
+def stage_lane(next_score):
+    global staged
+    lane = get_next_lane(next_score)
+    lane.update_position(-1)
+    staged = lane
+    yield
+
+def teardown_lane(lane):
+    for obj in lane.objects:
+        obj.sprite.mark_destroy()
+        yield
+    lane.box.mark_destroy()
+
+def drop_staged():
+    global staged
+    scheduler.flush()
+    if staged is not None:
+        staged.box.mark_destroy()
+        staged = None
+
 def check_collision(lane, player):
     if lane.ltype == 0: # Grass
         return False
       
-    dead = True
-    player_x = player.sprite.position.x
-    player_left = player_x - 5
-    player_right = player_x + 5
-
-    if player_x > 64 or player_x < -64:
+    player_x = player.x
+    if player_x > SCREEN_EDGE or player_x < -SCREEN_EDGE:
         return True
+
+    n = len(lane.objects)
+    lefts, rights = object_lefts.reserve(n), object_rights.reserve(n)
+    for i, obj in enumerate(lane.objects):
+        lefts[i] = obj.x - obj.half_width
+        rights[i] = obj.x + obj.half_width
       
     if lane.ltype == 1: # Street
-        dead = False
-        for car in lane.objects:
-            car_left = car.sprite.position.x - car.width/2
-            car_right = car.sprite.position.x + car.width/2
-            if player_right >= car_left and player_right < car_right:
-                dead = True
-                break
-            if player_left <= car_right and player_right > car_left:
-                dead = True
-                break
-              
-    elif lane.ltype == 2: # Log river
-        for log in lane.objects:
-            log_left = log.sprite.position.x - log.width/2
-            log_right = log.sprite.position.x + log.width/2
-            if player_x >= log_left and player_x <= log_right:
-                player.sprite.position.x += lane.speed * lane.direction
-                dead = False
-                break
-              
-    elif lane.ltype == 3: # Lily river
-        for lily in lane.objects:
-            lily_left = lily.sprite.position.x - lily.width/2
-            lily_right = lily.sprite.position.x + lily.width/2
-            if player_x >= lily_left and player_x <= lily_right:
-                player.sprite.position.x += lane.speed * lane.direction
-                dead = False
-                break
-    return dead
-
-
-scoreboard = Text2DNode(position=Vector2(0, -56), layer=4,
-                        text=f"Score: {score}",
+        return first_overlap(player_x - 5 * ONE, player_x + 5 * ONE, lefts, rights, n) >= 0
+
+    # Log or lily river, drown unless standing on something
+    if first_inside(player_x, lefts, rights, n) >= 0:
+        player.drift(lane.speed * lane.direction)
+        return False
+    return True
+
+
+# "Score:" is laid out once, the digits after it come from the glyph strip
+score_label = Text2DNode(position=Vector2(-14, -56), layer=4, text="Score:",
+                         letter_spacing=1.1)
+score_counter = Counter(Vector2(28, -56), 4)
+score_counter.set(score)
+scoreboard = Text2DNode(position=Vector2(0, -32), layer=4, text="",
                         letter_spacing=1.1, line_spacing=1.1)
+# Only laid out again when one of the numbers in it changes
+menu_text = Label(scoreboard, "World {}\nYour score {}\n\nHigh: {}\nachieved in world\n{}")
 player = Player()
 lanes = [Grass(), Grass(), Grass(), Grass(), Grass(),
          RiverLog(1, -1, 75), Grass(), Street(1, 1, 75)]
 for i, lane in enumerate(lanes):
     lane.update_position(len(lanes) - 1 - i)
+for path in ("/Games/FroggyRoad/car.bmp", "/Games/FroggyRoad/log.bmp",
+             "/Games/FroggyRoad/lily.bmp"):
+    texture(path)
 
 random.seed(world)
+scheduler.add(stage_lane(score + 1))
 game_running = True
 while game_running:
-    if engine.tick():
+    if governor.tick():
+        inputs.update()
+        telemetry.begin(governor.last_us)
         if rumble:
             rumble_clock += 1
             if rumble_clock > 20:
@@ -301,18 +375,19 @@ while game_running:
                 rumble = False
                 engine_io.rumble(0)
         if menu:
-            scoreboard.position = Vector2(0, -32)
-            scoreboard.text = f"World {world}\nYour score {score}\n\nHigh: {highscore}\nachieved in world\n{highworld}"
-            if engine_io.A.is_just_pressed:
+            menu_text.set(world, score, highscore, highworld)
+            if inputs.pressed("A"):
                 # Delete old game
                 menu = False
                 score = 0
-                scoreboard.position = Vector2(0, -56)
-                scoreboard.text = f"Score: {score}"
+                menu_text.clear()
+                score_label.opacity = 1.0
+                score_counter.set(score)
                 for lane in lanes:
                     if lane is not None:
                         lane.destroy_objects()
                         lane.box.mark_destroy()
+                nodeaudit.state("play")
                 # Create new game
                 danger_streak = 0
                 last_river_direction = -1
@@ -321,23 +396,39 @@ while game_running:
                          RiverLog(1, -1, 75), Grass(), Street(1, 1, 75)]
                 for i, lane in enumerate(lanes):
                     lane.update_position(len(lanes) - 1 - i)
-
-            if engine_io.LEFT.is_just_pressed:
-                world = 1
-            if engine_io.RIGHT.is_just_pressed:
-                world = 99
-            if engine_io.UP.is_just_pressed:
-                world = min(99, world+1)
-            if engine_io.DOWN.is_just_pressed:
-                world = max(1, world - 1)
-
-            if engine_io.MENU.is_just_pressed:
+                scheduler.add(stage_lane(score + 1))
+
+            for name in inputs.presses:
+                if name == "LEFT":
+                    world = 1
+                elif name == "RIGHT":
+                    world = 99
+                elif name == "UP":
+                    world = min(99, world+1)
+                elif name == "DOWN":
+                    world = max(1, world - 1)
+
+            if inputs.pressed("MENU"):
                 game_running = False
         else:
+            if advanced:
+                advance_frames.add(governor.last_us // 1000)
+            else:
+                other_frames.add(governor.last_us // 1000)
+            advanced = False
+
+            for name in inputs.presses:
+                if name == "UP" or name == "RB" or name == "LEFT" or name == "RIGHT":
+                    moves.append(name)
+
             for lane in lanes:
                 lane.manage_objects()
+            telemetry.phase(0) # Lanes
+            telemetry.count(0, sum(len(lane.objects) for lane in lanes))
+            telemetry.count(1, len(scheduler.jobs))
   
             player_died = check_collision(lanes[2], player)
+            telemetry.phase(1) # Collision
             if player_died:
                 if score > highscore:
                     highscore = score
@@ -348,41 +439,65 @@ while game_running:
                     lanes[i].destroy_objects()
                     lanes[i].box.mark_destroy()
                     lanes[i] = None
+                drop_staged()
                 rumble = True
                 engine_io.rumble(0.25)
+                moves.clear()
+                score_label.opacity = 0.0
+                score_counter.hide()
+                nodeaudit.state("menu")
                 menu = True
                 continue
             
-            if engine_io.UP.is_just_pressed or engine_io.RB.is_just_pressed:
+            move = moves.pop(0) if moves else None
+            if move == "UP" or move == "RB":
                 score += 1
-                scoreboard.text = f"Score: {score}"
+                score_counter.set(score)
               
-                lanes.append(get_next_lane(score))
+                if staged is None:
+                    scheduler.flush() # Hopped again before the next lane was ready
+                lanes.append(staged)
+                staged = None
                 for i, lane in enumerate(lanes):
                     lane.update_position(len(lanes) - 1 - i)
                 
-                lanes[0].destroy_objects()
-                lanes[0].box.mark_destroy()
-                lanes.pop(0)
+                scheduler.add(teardown_lane(lanes.pop(0)))
+                scheduler.add(stage_lane(score + 1))
 
                 player.sprite.rotation = 0
+                advanced = True
 
-            if engine_io.LEFT.is_just_pressed:
+            elif move == "LEFT":
                 player.move(-1)
-            if engine_io.RIGHT.is_just_pressed:
+            elif move == "RIGHT":
                 player.move(1)
+
+            if not advanced:
+                scheduler.run() # Jobs queued by a hop start on the next frame
+            telemetry.phase(2) # Hop and lane jobs
               
-            if engine_io.MENU.is_just_pressed:
+            if inputs.pressed("MENU"):
                 if score > highscore:
                     highscore = score
                     highworld = world
+                drop_staged()
                 for i in range(len(lanes)):
                     lanes[i].destroy_objects()
                     lanes[i].box.mark_destroy()
                     lanes[i] = None
+                moves.clear()
+                score_label.opacity = 0.0
+                score_counter.hide()
+                nodeaudit.state("menu")
                 menu = True
                 continue
 
 engine_save.save("world", world)
 engine_save.save("highscore", highscore)
 engine_save.save("highworld", highworld)
+telemetry.close()
+inputs.close()
+print(inputs.report())
+print("Frame cost")
+print(advance_frames.report("advance frames"))
+print(other_frames.report("other frames"))
@@ -0,0 +1,15 @@
+# Microsecond clock shared by the lib modules.
+# MicroPython has ticks_us/ticks_diff, CPython (host tools) does not.
+try:
+    from time import ticks_us, ticks_ms, ticks_diff
+except ImportError:
+    from time import perf_counter_ns
+
+    def ticks_us():
+        return perf_counter_ns() // 1000
+
+    def ticks_ms():
+        return perf_counter_ns() // 1000000
+
+    def ticks_diff(new, old):
+        return new - old
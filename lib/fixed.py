@@ -0,0 +1,83 @@
+from math import pi, sin, cos
+
+# Q8.8 fixed-point kinematics
+#
+# Positions and velocities are plain ints holding 1/256ths of a pixel. The
+# screen is +-64 pixels, so everything stays a small int and nothing is
+# boxed on the heap the way floats are on MicroPython. The maths is the same
+# bit for bit on the device and on a PC. Floats are only made when a value
+# is written back to a node.
+
+SHIFT = 8
+ONE = 1 << SHIFT
+HALF = ONE >> 1
+
+
+def to_fixed(value):
+    return round(value * ONE)
+
+
+def to_px(value):
+    # Nearest whole pixel
+    return (value + HALF) >> SHIFT
+
+
+def mul(a, b):
+    # Rounded like quot(), >> alone would floor negative products
+    p = a * b
+    if p < 0:
+        return -((HALF - p) >> SHIFT)
+    return (p + HALF) >> SHIFT
+
+
+def quot(a, b):
+    # a / b to the nearest int, rounding the same way either side of zero
+    # (// floors, which would make negative values a step bigger)
+    if a < 0:
+        return -((b // 2 - a) // b)
+    return (a + b // 2) // b
+
+
+def clamp(value, limit):
+    if value > limit:
+        return limit
+    if value < -limit:
+        return -limit
+    return value
+
+
+def trig_table(steps):
+    # cos and sin of k*2*pi/steps for k in range(steps), in Q8.8
+    cos_table = [to_fixed(cos(2 * pi * k / steps)) for k in range(steps)]
+    sin_table = [to_fixed(sin(2 * pi * k / steps)) for k in range(steps)]
+    return cos_table, sin_table
+
+
+class Body:
+    def __init__(self, x=0, y=0, vx=0, vy=0):
+        self.x = x
+        self.y = y
+        self.vx = vx
+        self.vy = vy
+
+    def step(self):
+        self.x += self.vx
+        self.y += self.vy
+
+    def wrap(self, edge, reset):
+        # Past +-edge jumps to -+reset on the other side of the screen
+        if self.x >= edge:
+            self.x = -reset
+        elif self.x <= -edge:
+            self.x = reset
+        if self.y >= edge:
+            self.y = -reset
+        elif self.y <= -edge:
+            self.y = reset
+
+    def outside(self, limit):
+        return self.x > limit or self.x < -limit or self.y > limit or self.y < -limit
+
+    def write(self, node):
+        node.position.x = to_px(self.x)
+        node.position.y = to_px(self.y)
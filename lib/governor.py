@@ -0,0 +1,133 @@
+from clock import ticks_us, ticks_diff
+
+# Frame-time governor
+#
+# Wraps engine.tick() and measures how long each frame really costs: the game
+# code run after the last tick plus the render done inside the tick that
+# returns True. The time spent spinning on ticks that return False is idle
+# time, so a frame that costs less than the budget is headroom.
+#
+# The average over a rolling window is compared against the budget:
+#   avg > budget * raise_at -> level goes up (less optional load)
+#   avg < budget * lower_at -> level goes down (back towards full quality)
+# After every change the window is refilled before the next decision.
+#
+# Games register knobs with the value they want at full quality and at the
+# highest level, and read them back with limit(). Every level change is kept
+# in actions as (frame, old level, new level, average frame cost in us).
+
+class FrameGovernor:
+    def __init__(self, tick, budget_ms=40, window=15, levels=4,
+                 raise_at=0.95, lower_at=0.7):
+        self.engine_tick = tick
+        self.budget_us = budget_ms * 1000
+        self.window = window
+        self.levels = levels
+        self.raise_at = raise_at
+        self.lower_at = lower_at
+
+        self.level = 0
+        self.held = False
+        self.frame = 0
+        self.last_us = 0
+        self.actions = []
+        self.max_actions = 16
+
+        self.knobs = {}
+        self.values = {}
+        self.listeners = []
+
+        self.samples = [0] * window
+        self.filled = 0
+        self.index = 0
+        self.total = 0
+
+        self.busy = False
+        self.work_us = 0
+        self.frame_start = ticks_us()
+
+    def add_knob(self, name, full, reduced):
+        self.knobs[name] = (full, reduced)
+        self.values[name] = self.knob_value(full, reduced)
+
+    def knob_value(self, full, reduced):
+        return full + (reduced - full) * self.level // self.levels
+
+    def limit(self, name):
+        return self.values[name]
+
+    def on_change(self, callback):
+        # callback(governor) is called after every level change
+        self.listeners.append(callback)
+
+    def average_us(self):
+        if self.filled == 0:
+            return 0
+        return self.total // self.filled
+
+    def tick(self):
+        now = ticks_us()
+        if self.busy:
+            # First tick() since the frame started, the game code is done
+            self.busy = False
+            self.work_us = ticks_diff(now, self.frame_start)
+
+        if not self.engine_tick():
+            return False
+
+        start = ticks_us()
+        if self.frame > 0:
+            self.sample(self.work_us + ticks_diff(start, now))
+        self.frame += 1
+        self.busy = True
+        self.frame_start = start
+        return True
+
+    def sample(self, cost_us):
+        self.last_us = cost_us
+        self.total += cost_us - self.samples[self.index]
+        self.samples[self.index] = cost_us
+        self.index = (self.index + 1) % self.window
+        if self.filled < self.window:
+            self.filled += 1
+            return
+        if self.held:
+            return
+
+        avg = self.total // self.window
+        if avg > self.budget_us * self.raise_at and self.level < self.levels:
+            self.set_level(self.level + 1)
+        elif avg < self.budget_us * self.lower_at and self.level > 0:
+            self.set_level(self.level - 1)
+
+    def set_level(self, level):
+        level = max(0, min(level, self.levels))
+        old = self.level
+        if level == old:
+            return
+        self.level = level
+        for name in self.knobs:
+            full, reduced = self.knobs[name]
+            self.values[name] = self.knob_value(full, reduced)
+
+        self.actions.append((self.frame, old, level, self.average_us()))
+        if len(self.actions) > self.max_actions:
+            self.actions.pop(0)
+
+        # Start a fresh window so the new level is judged on its own frames
+        for i in range(self.window):
+            self.samples[i] = 0
+        self.filled = 0
+        self.index = 0
+        self.total = 0
+
+        for callback in self.listeners:
+            callback(self)
+
+    def hold(self, level=0):
+        # Pin the level, e.g. for benchmarks or replays that must not adapt
+        self.set_level(level)
+        self.held = True
+
+    def release(self):
+        self.held = False
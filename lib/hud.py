@@ -0,0 +1,114 @@
+from engine_draw import Color
+from engine_math import Vector2
+from engine_nodes import Sprite2DNode
+from engine_resources import TextureResource
+
+# HUD pieces that don't lay out text every frame
+#
+# Counter shows a whole number with one sprite per digit, all sharing a
+# strip of the ten digit glyphs drawn once at startup. set() only touches
+# the digits that changed, so calling it every frame costs a few integer
+# divisions and compares. Values too long for the counter show as all 9s.
+#
+# Label keeps a Text2DNode's text in step with a few values, formatting and
+# setting the text only when one of them changed.
+
+GLYPH_WIDTH = 5
+GLYPH_HEIGHT = 7
+ADVANCE = GLYPH_WIDTH + 1 # One column of spacing, part of each frame
+
+# 5x7 digits, one byte per row, bit 4 is the leftmost column
+GLYPHS = bytes((
+    0x0e, 0x11, 0x13, 0x15, 0x19, 0x11, 0x0e, # 0
+    0x04, 0x0c, 0x04, 0x04, 0x04, 0x04, 0x0e, # 1
+    0x0e, 0x11, 0x01, 0x02, 0x04, 0x08, 0x1f, # 2
+    0x1f, 0x02, 0x04, 0x02, 0x01, 0x11, 0x0e, # 3
+    0x02, 0x06, 0x0a, 0x12, 0x1f, 0x02, 0x02, # 4
+    0x1f, 0x10, 0x1e, 0x01, 0x01, 0x11, 0x0e, # 5
+    0x06, 0x08, 0x10, 0x1e, 0x11, 0x11, 0x0e, # 6
+    0x1f, 0x01, 0x02, 0x04, 0x08, 0x08, 0x08, # 7
+    0x0e, 0x11, 0x11, 0x0e, 0x11, 0x11, 0x0e, # 8
+    0x0e, 0x11, 0x11, 0x0f, 0x01, 0x02, 0x0c, # 9
+))
+
+strips = {} # RGB565 colour -> (texture, transparent colour), shared by every Counter
+
+
+def digit_strip(color=0xffff):
+    # Ten glyphs side by side in one texture, for Sprite2DNode frames
+    if color in strips:
+        return strips[color]
+    key = 0xffff if color == 0 else 0
+    width = ADVANCE * 10
+    texture = TextureResource(width, GLYPH_HEIGHT, key, 16)
+    data = texture.data
+    for digit in range(10):
+        for row in range(GLYPH_HEIGHT):
+            bits = GLYPHS[digit * GLYPH_HEIGHT + row]
+            for column in range(GLYPH_WIDTH):
+                if bits & (0x10 >> column):
+                    i = (row * width + digit * ADVANCE + column) * 2
+                    data[i] = color & 0xff
+                    data[i + 1] = color >> 8
+    strips[color] = (texture, Color(key))
+    return strips[color]
+
+
+class Counter:
+    def __init__(self, position, digits, color=0xffff, layer=4):
+        texture, key = digit_strip(color)
+        self.value = None
+        self.largest = 10 ** digits - 1
+        self.shown = bytearray(digits) # Glyph on each sprite, rightmost digit first
+        self.lit = bytearray(digits) # Whether each sprite is showing
+        self.sprites = []
+        for i in range(digits):
+            sprite = Sprite2DNode(texture=texture, transparent_color=key,
+                                  frame_count_x=10, playing=False, opacity=0.0,
+                                  layer=layer)
+            self.sprites.append(sprite)
+        self.move(position)
+
+    def move(self, position):
+        # position is the centre of the rightmost digit, numbers grow leftwards
+        for i, sprite in enumerate(self.sprites):
+            sprite.position = Vector2(position.x - i * ADVANCE, position.y)
+
+    def set(self, value):
+        if value > self.largest:
+            value = self.largest
+        if value == self.value:
+            return
+        self.value = value
+        for i in range(len(self.sprites)):
+            lit = i == 0 or value > 0 # Leading zeros are left blank
+            digit = value % 10
+            value //= 10
+            if digit != self.shown[i]:
+                self.shown[i] = digit
+                self.sprites[i].frame_current_x = digit
+            if lit != self.lit[i]:
+                self.lit[i] = lit
+                self.sprites[i].opacity = 1.0 if lit else 0.0
+
+    def hide(self):
+        for i in range(len(self.sprites)):
+            self.lit[i] = 0
+            self.sprites[i].opacity = 0.0
+        self.value = None # Next set() shows it again
+
+
+class Label:
+    def __init__(self, node, template):
+        self.node = node
+        self.template = template
+        self.values = None
+
+    def set(self, *values):
+        if values != self.values:
+            self.values = values
+            self.node.text = self.template.format(*values)
+
+    def clear(self):
+        self.values = None # Next set() writes the text again
+        self.node.text = ""
@@ -0,0 +1,158 @@
+import engine_io
+
+from clock import ticks_us, ticks_diff
+from stats import Histogram
+
+# Buffered button input
+#
+# engine_io only updates once per engine.tick(), so two quick taps of the same
+# button between ticks show up as one is_just_pressed, or none at all. Here
+# every button edge is caught by a hard pin interrupt when it happens, even
+# mid-render, stamped with ticks_us() and queued. The handlers run with the
+# heap locked, so they only write small ints into the preallocated ring
+# buffer, and take the edge direction from the IRQ flags: by the time the
+# pin is read the button may have been released again. update() hands the game all the edges from the
+# last frame in the order they happened, and records how long each press
+# waited for a frame.
+#
+# Without machine.Pin (e.g. the headless engine) the edges come from engine_io
+# once per frame instead. Those presses are stamped with the previous frame
+# time, so their latency is an upper bound.
+#
+# Call close() when the game loop ends to detach the pin interrupts.
+
+NAMES = ("A", "B", "UP", "DOWN", "LEFT", "RIGHT", "LB", "RB", "MENU")
+
+# Thumby Color button GPIOs, pulled up, so 0 means pressed
+PINS = (21, 25, 1, 3, 0, 2, 6, 22, 26)
+
+DEBOUNCE_US = 4000
+LATENCY_EDGES = (5, 10, 20, 30, 40, 60, 80, 120)
+
+try:
+    from machine import Pin
+    FALLING = Pin.IRQ_FALLING
+    RISING = Pin.IRQ_RISING
+except ImportError:
+    Pin = None
+
+
+class InputQueue:
+    def __init__(self, size=32, use_pins=True):
+        self.size = size
+        self.buttons = [getattr(engine_io, name) for name in NAMES]
+        self.latency = {name: Histogram(LATENCY_EDGES) for name in NAMES}
+
+        # Ring buffer of (button index, pressed, time) filled by the interrupts
+        self.q_button = [0] * size
+        self.q_pressed = [False] * size
+        self.q_time = [0] * size
+        self.head = 0
+        self.tail = 0
+        self.dropped = 0
+
+        self.state = [False] * len(NAMES)
+        self.last_edge = [0] * len(NAMES)
+        self.frame_time = ticks_us()
+
+        self.events = [] # (name, pressed) since the last frame, oldest first
+        self.presses = [] # Names pressed since the last frame, oldest first
+        self.releases = []
+
+        self.pins = []
+        if use_pins and Pin is not None:
+            for i, number in enumerate(PINS):
+                pin = Pin(number)
+                self.state[i] = pin.value() == 0
+                pin.irq(self.edge_handler(i), FALLING | RISING, hard=True)
+                self.pins.append(pin)
+
+    def edge_handler(self, i):
+        def handler(pin):
+            now = ticks_us()
+            flags = pin.irq().flags()
+            if flags == FALLING:
+                pressed = True # Pulled up, so falling is a press
+            elif flags == RISING:
+                pressed = False
+            else:
+                pressed = pin.value() == 0 # Both edges seen, go by the level
+            self.edge(i, pressed, now)
+        return handler
+
+    def edge(self, i, pressed, now):
+        if pressed == self.state[i]:
+            return
+        if ticks_diff(now, self.last_edge[i]) < DEBOUNCE_US:
+            return
+        self.state[i] = pressed
+        self.last_edge[i] = now
+        self.push(i, pressed, now)
+
+    def push(self, i, pressed, now):
+        nxt = (self.head + 1) % self.size
+        if nxt == self.tail:
+            self.dropped += 1
+            return
+        self.q_button[self.head] = i
+        self.q_pressed[self.head] = pressed
+        self.q_time[self.head] = now
+        self.head = nxt
+
+    def update(self):
+        # Call once per frame, right after engine.tick() returned True
+        now = ticks_us()
+        self.events.clear()
+        self.presses.clear()
+        self.releases.clear()
+
+        while self.tail != self.head:
+            i = self.q_button[self.tail]
+            self.deliver(i, self.q_pressed[self.tail], self.q_time[self.tail], now)
+            self.tail = (self.tail + 1) % self.size
+
+        if not self.pins:
+            self.poll(now)
+
+        self.frame_time = now
+        return self.events
+
+    def poll(self, now):
+        for i, button in enumerate(self.buttons):
+            if button.is_just_pressed:
+                self.deliver(i, True, self.frame_time, now)
+            elif button.is_just_released:
+                self.deliver(i, False, self.frame_time, now)
+
+    def deliver(self, i, pressed, when, now):
+        name = NAMES[i]
+        self.events.append((name, pressed))
+        if pressed:
+            self.presses.append(name)
+            self.latency[name].add(ticks_diff(now, when) // 1000)
+        else:
+            self.releases.append(name)
+
+    def pressed(self, name):
+        return name in self.presses
+
+    def released(self, name):
+        return name in self.releases
+
+    def held(self, name):
+        return self.buttons[NAMES.index(name)].is_pressed
+
+    def close(self):
+        # Detach the interrupts, their handlers would keep the queue alive
+        for pin in self.pins:
+            pin.irq(None)
+        self.pins = []
+
+    def report(self):
+        lines = ["Press to frame latency"]
+        for name in NAMES:
+            if self.latency[name].total:
+                lines.append(self.latency[name].report(name))
+        if self.dropped:
+            lines.append(f"dropped {self.dropped} edges, queue full")
+        return "\n".join(lines)
@@ -0,0 +1,104 @@
+from array import array
+
+# Hot inner loops of the games, behind one interface.
+#
+# Every kernel works on ints (Q8.8 from fixed.py, or cell values) held in
+# array('i') / bytearray buffers. On the device the viper-compiled versions
+# from kernels_viper.py are used. Where viper isn't available (a PC, or
+# firmware built without the native emitters) the plain Python versions
+# below are used instead; they give the same results.
+#
+# first_circle_hit(x, y, xs, ys, rs, n)
+#     Index of the first circle i < n with (x, y) strictly inside, or -1.
+# first_circle_pair(xs, ys, rs, n, px, py, m)
+#     First circle i (then point j) with point j inside circle i, returned
+#     as (i << 8) | j, or -1. m must be below 256.
+# first_overlap(left, right, lefts, rights, n)
+#     Index of the first interval that [left, right] runs into, or -1.
+# first_inside(x, lefts, rights, n)
+#     Index of the first interval with lefts[i] <= x <= rights[i], or -1.
+# swap_block(cells, size, sx, sy, forward, depth)
+#     Step every cell of the 3x3 block around (sx, sy) on a size*size board
+#     (cell (x, y) at x*size + y) one value forward or back, wrapping at
+#     depth. Returns the change in the number of non-zero cells.
+
+
+def py_first_circle_hit(x, y, xs, ys, rs, n):
+    for i in range(n):
+        r = rs[i]
+        dx = xs[i] - x
+        dy = ys[i] - y
+        if -r < dx < r and -r < dy < r and dx * dx + dy * dy < r * r:
+            return i
+    return -1
+
+
+def py_first_circle_pair(xs, ys, rs, n, px, py, m):
+    for i in range(n):
+        r = rs[i]
+        cx = xs[i]
+        cy = ys[i]
+        for j in range(m):
+            dx = cx - px[j]
+            dy = cy - py[j]
+            if -r < dx < r and -r < dy < r and dx * dx + dy * dy < r * r:
+                return (i << 8) | j
+    return -1
+
+
+def py_first_overlap(left, right, lefts, rights, n):
+    for i in range(n):
+        if right >= lefts[i] and right < rights[i]:
+            return i
+        if left <= rights[i] and right > lefts[i]:
+            return i
+    return -1
+
+
+def py_first_inside(x, lefts, rights, n):
+    for i in range(n):
+        if lefts[i] <= x <= rights[i]:
+            return i
+    return -1
+
+
+def py_swap_block(cells, size, sx, sy, forward, depth):
+    delta = 0
+    for x in range(max(sx - 1, 0), min(sx + 2, size)):
+        for y in range(max(sy - 1, 0), min(sy + 2, size)):
+            i = x * size + y
+            old = cells[i]
+            if forward:
+                new = old + 1 if old + 1 < depth else 0
+            else:
+                new = old - 1 if old > 0 else depth - 1
+            cells[i] = new
+            if old == 0:
+                delta += 1
+            elif new == 0:
+                delta -= 1
+    return delta
+
+
+try:
+    from kernels_viper import (first_circle_hit, first_circle_pair, first_overlap,
+                               first_inside, swap_block)
+    FAST = True
+except Exception: # No viper emitter, or a ViperTypeError while compiling
+    first_circle_hit = py_first_circle_hit
+    first_circle_pair = py_first_circle_pair
+    first_overlap = py_first_overlap
+    first_inside = py_first_inside
+    swap_block = py_swap_block
+    FAST = False
+
+
+class Buffer:
+    # Reusable array('i') that grows when a game has more items than usual
+    def __init__(self, capacity=32):
+        self.data = array("i", [0] * capacity)
+
+    def reserve(self, n):
+        if n > len(self.data):
+            self.data = array("i", [0] * (n * 2))
+        return self.data
@@ -0,0 +1,80 @@
+import micropython
+
+# Viper versions of the kernels in kernels.py, see there for what each does.
+# Only imported on the device; the buffers must be array('i') (ptr32) or
+# bytearray (ptr8).
+
+
+@micropython.viper
+def first_circle_hit(x: int, y: int, xs: ptr32, ys: ptr32, rs: ptr32, n: int) -> int:
+    for i in range(n):
+        r = rs[i]
+        dx = xs[i] - x
+        dy = ys[i] - y
+        if dx < r and dx > 0 - r and dy < r and dy > 0 - r:
+            if dx * dx + dy * dy < r * r:
+                return i
+    return -1
+
+
+@micropython.viper
+def first_circle_pair(xs: ptr32, ys: ptr32, rs: ptr32, n: int,
+                      px: ptr32, py: ptr32, m: int) -> int:
+    for i in range(n):
+        r = rs[i]
+        cx = xs[i]
+        cy = ys[i]
+        for j in range(m):
+            dx = cx - px[j]
+            dy = cy - py[j]
+            if dx < r and dx > 0 - r and dy < r and dy > 0 - r:
+                if dx * dx + dy * dy < r * r:
+                    return (i << 8) | j
+    return -1
+
+
+@micropython.viper
+def first_overlap(left: int, right: int, lefts: ptr32, rights: ptr32, n: int) -> int:
+    for i in range(n):
+        lo = lefts[i]
+        hi = rights[i]
+        if right >= lo and right < hi:
+            return i
+        if left <= hi and right > lo:
+            return i
+    return -1
+
+
+@micropython.viper
+def first_inside(x: int, lefts: ptr32, rights: ptr32, n: int) -> int:
+    for i in range(n):
+        if lefts[i] <= x and x <= rights[i]:
+            return i
+    return -1
+
+
+@micropython.viper
+def swap_block(cells: ptr8, size: int, sx: int, sy: int, forward: int, depth: int) -> int:
+    x0 = sx - 1 if sx > 0 else 0
+    y0 = sy - 1 if sy > 0 else 0
+    x1 = sx + 2 if sx + 2 < size else size
+    y1 = sy + 2 if sy + 2 < size else size
+    delta = 0
+    x = x0
+    while x < x1:
+        y = y0
+        while y < y1:
+            i = x * size + y
+            old = cells[i]
+            if forward:
+                new = old + 1 if old + 1 < depth else 0
+            else:
+                new = old - 1 if old > 0 else depth - 1
+            cells[i] = new
+            if old == 0:
+                delta += 1
+            elif new == 0:
+                delta -= 1
+            y += 1
+        x += 1
+    return delta
@@ -0,0 +1,174 @@
+import engine_nodes
+
+# Node lifecycle auditor
+#
+# Off unless install() is called before the game imports engine_nodes names.
+# It swaps each node class in engine_nodes for a subclass that remembers
+# every node made, which game state made it, and when it was marked for
+# destruction. Games call state(name) at each state change, once the old
+# state's nodes are torn down and before the new state's are made:
+#
+#   nodeaudit.state("menu")
+#
+# At each call the auditor takes a count of live nodes per type and flags:
+#   - nodes made in the state being left that are still alive (carried over,
+#     sometimes on purpose, e.g. FroggyRoad keeps the lanes the frog died in)
+#   - nodes made in an earlier round of the state being entered that are
+#     still alive (leaked, nothing will ever destroy them)
+#
+# Nodes made before the first state() call belong to "setup" and are never
+# counted as leaked. report() sums it all up. tools/soak_nodes.py runs the
+# games headless through hundreds of restarts with this installed.
+
+CLASSES = ("EmptyNode", "CameraNode", "Rectangle2DNode", "Circle2DNode",
+           "Sprite2DNode", "Text2DNode")
+
+installed = False
+current = "setup"
+rounds = {"setup": 1} # Times each state has been entered
+nodes = {} # id(node) -> [node, type name, state, round]
+created = 0
+destroyed = 0
+snapshots = {} # state -> live nodes per type at each entry
+carried = {} # (from state, to state) -> {type: most carried over at once}
+leaked = {} # state -> {type: most leaked at once}
+
+
+def track(node, kind):
+    global created
+    created += 1
+    nodes[id(node)] = [node, kind, current, rounds[current]]
+
+
+def forget(node):
+    global destroyed
+    if nodes.pop(id(node), None) is not None:
+        destroyed += 1
+
+
+def audited(base):
+    class Audited(base):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            # Game subclasses such as BitFlip's Tile are counted under their own name
+            track(self, base.__name__ if type(self) is Audited else type(self).__name__)
+
+        def mark_destroy(self):
+            forget(self)
+            super().mark_destroy()
+
+        def destroy(self):
+            forget(self)
+            super().destroy()
+    return Audited
+
+
+def install():
+    global installed
+    if installed:
+        return
+    for name in CLASSES:
+        base = getattr(engine_nodes, name, None)
+        if base is not None:
+            setattr(engine_nodes, name, audited(base))
+    installed = True
+
+
+def reset():
+    global current, created, destroyed
+    current = "setup"
+    rounds.clear()
+    rounds["setup"] = 1
+    nodes.clear()
+    created = 0
+    destroyed = 0
+    snapshots.clear()
+    carried.clear()
+    leaked.clear()
+
+
+def live_counts():
+    counts = {}
+    for _, name, _, _ in nodes.values():
+        counts[name] = counts.get(name, 0) + 1
+    return counts
+
+
+def note(table, key, counts):
+    # Keep the worst count per type seen for a key
+    worst = table.setdefault(key, {})
+    for name, count in counts.items():
+        if count > worst.get(name, 0):
+            worst[name] = count
+
+
+def state(name):
+    global current
+    if not installed:
+        return
+    entering_round = rounds.get(name, 0) + 1
+    survivors = {}
+    stale = {}
+    for _, kind, made_in, made_round in nodes.values():
+        if made_in == current and made_in != "setup" and made_in != name:
+            survivors[kind] = survivors.get(kind, 0) + 1
+        if made_in == name and made_round < entering_round:
+            stale[kind] = stale.get(kind, 0) + 1
+    if survivors:
+        note(carried, (current, name), survivors)
+    if stale:
+        note(leaked, name, stale)
+
+    snapshots.setdefault(name, []).append(live_counts())
+    rounds[name] = entering_round
+    current = name
+
+
+def growing(name):
+    # Types whose live count at entry to a state kept climbing: higher in
+    # the last quarter of entries than in the second one
+    entries = snapshots.get(name, [])
+    if len(entries) < 8:
+        return {}
+    early = entries[1]
+    late = entries[len(entries) * 3 // 4:]
+    result = {}
+    for kind in late[0]:
+        low = min(entry.get(kind, 0) for entry in late)
+        if low > early.get(kind, 0):
+            result[kind] = (early.get(kind, 0), entries[-1].get(kind, 0))
+    return result
+
+
+def problems():
+    # Leaks and growth, as (state, type, description) tuples
+    found = []
+    for name, counts in leaked.items():
+        for kind, count in counts.items():
+            found.append((name, kind, "up to %d left over from earlier rounds" % count))
+    for name in snapshots:
+        for kind, (first, last) in growing(name).items():
+            found.append((name, kind, "live count grew from %d to %d" % (first, last)))
+    return found
+
+
+def report():
+    lines = ["%d nodes made, %d destroyed, %d live" % (created, destroyed, len(nodes))]
+    for name, entries in snapshots.items():
+        lines.append("entering %s (%d times), live per type first/last/max:" % (name, len(entries)))
+        kinds = {}
+        for entry in entries:
+            for kind in entry:
+                kinds[kind] = True
+        for kind in sorted(kinds):
+            counts = [entry.get(kind, 0) for entry in entries]
+            lines.append("  %-16s %5d %5d %5d" % (kind, counts[0], counts[-1], max(counts)))
+    for (left, entered), counts in carried.items():
+        lines.append("carried over from %s into %s: %s" % (left, entered, ", ".join(
+            "%s x%d" % (kind, count) for kind, count in sorted(counts.items()))))
+    found = problems()
+    for name, kind, text in found:
+        lines.append("LEAK entering %s: %s %s" % (name, kind, text))
+    if not found:
+        lines.append("no leaks")
+    return "\n".join(lines)
@@ -0,0 +1,39 @@
+from clock import ticks_us, ticks_diff
+
+# Per-frame work scheduler
+#
+# Jobs are generators, and every next() on one is a small step of work. Call
+# run() once per frame: it keeps stepping jobs, oldest first, until the
+# budget is used up or nothing is left. At least one step runs per call, so
+# work always moves forward even on a slow frame. flush() finishes
+# everything now, for when a result is needed straight away.
+#
+# The budget only counts time inside run(), so a frame that already did a
+# lot of work (e.g. the one that queued the jobs) should skip run().
+
+class WorkScheduler:
+    def __init__(self, budget_us=3000):
+        self.budget_us = budget_us
+        self.jobs = []
+        self.steps = 0 # Total steps run, for tuning the budget
+
+    def add(self, job):
+        self.jobs.append(job)
+
+    def step(self):
+        try:
+            next(self.jobs[0])
+        except StopIteration:
+            self.jobs.pop(0)
+        self.steps += 1
+
+    def run(self):
+        start = ticks_us()
+        while self.jobs:
+            self.step()
+            if ticks_diff(ticks_us(), start) >= self.budget_us:
+                break
+
+    def flush(self):
+        while self.jobs:
+            self.step()
@@ -0,0 +1,43 @@
+# Fixed-bin histogram, allocation free once built. Values above the last
+# edge go in an overflow bin.
+
+class Histogram:
+    def __init__(self, edges, unit="ms"):
+        self.edges = edges
+        self.unit = unit
+        self.counts = [0] * (len(edges) + 1)
+        self.total = 0
+        self.largest = 0
+
+    def add(self, value):
+        i = 0
+        while i < len(self.edges) and value >= self.edges[i]:
+            i += 1
+        self.counts[i] += 1
+        self.total += 1
+        if value > self.largest:
+            self.largest = value
+
+    def percentile(self, p):
+        # Upper edge of the bin holding the p-th percentile
+        if self.total == 0:
+            return 0
+        target = self.total * p / 100
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return self.edges[i] if i < len(self.edges) else self.largest
+        return self.largest
+
+    def report(self, name=""):
+        lines = [f"{name} n={self.total} p50<{self.percentile(50)}{self.unit} "
+                 f"p90<{self.percentile(90)}{self.unit} max={self.largest}{self.unit}"]
+        low = 0
+        for i, count in enumerate(self.counts):
+            if count:
+                high = f"{self.edges[i]}" if i < len(self.edges) else "inf"
+                lines.append(f"  {low}-{high}{self.unit}: {count}")
+            if i < len(self.edges):
+                low = self.edges[i]
+        return "\n".join(lines)
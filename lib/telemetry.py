@@ -0,0 +1,115 @@
+import gc
+import struct
+import sys
+
+from clock import ticks_us, ticks_diff
+
+# Per-frame binary telemetry
+#
+# One fixed 24 byte record per frame, written to a file or to USB serial and
+# read back on a PC with tools/telemetry_report.py:
+#
+#   magic        u16  0x4d54 ("TM")
+#   seq          u16  frame number, wraps
+#   frame_us     u32  what the frame cost, game code plus render
+#   phase_us     3 x u16  time spent in up to three phases of the game code
+#   counts       3 x u8   live entity counts, which ones depends on the game
+#   game         u8   1 Asteroids, 2 BitFlip, 3 FroggyRoad
+#   heap_free    u32  gc.mem_free() at the end of the frame
+#   gc_events    u8   collections seen so far (free heap went up), wraps
+#   checksum     u8   sum of the 23 bytes before it, & 0xff
+#
+# The record for a frame is written at the start of the next one, once the
+# governor knows what it cost. Games keep a Telemetry around even when it's
+# off; every method returns straight away without a sink.
+
+FORMAT = "<HHIHHHBBBBIB"
+MAGIC = 0x4d54
+SIZE = 24
+
+ASTEROIDS = 1
+BITFLIP = 2
+FROGGYROAD = 3
+
+
+def open_sink(target):
+    # None (off), "usb" for the serial console, or a file path
+    if target is None:
+        return None
+    if target == "usb":
+        return getattr(sys.stdout, "buffer", sys.stdout)
+    return open(target, "wb")
+
+
+class Telemetry:
+    def __init__(self, target, game):
+        self.sink = open_sink(target)
+        self.owned = target is not None and target != "usb" # Close it when done
+        self.game = game
+        self.record = bytearray(SIZE)
+        self.seq = 0
+        self.phases = [0, 0, 0]
+        self.counts = [0, 0, 0]
+        self.mark = ticks_us()
+        self.start = self.mark # When the current frame's game code started
+        self.pending = False
+        self.gc_events = 0
+        self.last_free = gc.mem_free() if hasattr(gc, "mem_free") else 0
+
+    def begin(self, last_frame_us):
+        # Start of a frame: send the previous frame's record
+        if self.sink is None:
+            return
+        if self.pending:
+            self.send(last_frame_us)
+        self.pending = True
+        for i in range(3):
+            self.phases[i] = 0
+            self.counts[i] = 0
+        self.mark = ticks_us()
+        self.start = self.mark
+
+    def phase(self, i):
+        # End of phase i, timed from the last mark
+        if self.sink is None:
+            return
+        now = ticks_us()
+        self.phases[i] += ticks_diff(now, self.mark)
+        self.mark = now
+
+    def count(self, i, value):
+        if self.sink is None:
+            return
+        self.counts[i] = value
+
+    def send(self, frame_us):
+        free = gc.mem_free() if hasattr(gc, "mem_free") else 0
+        if free > self.last_free:
+            self.gc_events += 1
+        self.last_free = free
+
+        record = self.record
+        struct.pack_into(FORMAT, record, 0, MAGIC, self.seq & 0xffff,
+                         min(frame_us, 0xffffffff),
+                         min(self.phases[0], 0xffff), min(self.phases[1], 0xffff),
+                         min(self.phases[2], 0xffff),
+                         min(self.counts[0], 255), min(self.counts[1], 255),
+                         min(self.counts[2], 255), self.game, free,
+                         self.gc_events & 0xff)
+        total = 0
+        for i in range(SIZE - 1):
+            total += record[i]
+        record[SIZE - 1] = total & 0xff
+        self.sink.write(record)
+        self.seq += 1
+
+    def close(self):
+        if self.sink is None:
+            return
+        if self.pending:
+            # The last frame is never rendered, so its cost is the game code alone
+            self.send(ticks_diff(ticks_us(), self.start))
+            self.pending = False
+        if self.owned:
+            self.sink.close()
+        self.sink = None
@@ -0,0 +1,79 @@
+from engine_draw import Color
+from engine_resources import TextureResource
+
+# Loader for textures baked by tools/bake_assets.py
+#
+# A baked .tex file is a 16 byte header followed by the pixels exactly as
+# the engine keeps them (RGB565, little-endian, top row first), so loading
+# is one readinto() straight into the texture's buffer:
+#
+#   0  b"TCT1"
+#   4  width, height         (u16 each)
+#   8  frames                (u16, sprites side by side in an atlas)
+#   10 flags                 (u16, bit 0: key colour is set)
+#   12 key colour            (u16, RGB565)
+#   14 reserved              (u16)
+#
+# An atlas has a name table after the pixels: a u8 length and the name for
+# each frame.
+#
+# load() takes the path of the original .bmp. If there is no baked file next
+# to it, the BMP is loaded the old way, so unbaked games still run.
+
+MAGIC = b"TCT1"
+HEADER_SIZE = 16
+HAS_KEY = 1
+
+# Maps a device path to a real one; the headless engine points it at the repo
+resolve = None
+
+
+def u16(data, offset):
+    return data[offset] | (data[offset + 1] << 8)
+
+
+def baked_path(path):
+    if path.endswith(".bmp"):
+        return path[:-4] + ".tex"
+    return path
+
+
+def open_file(path):
+    return open(resolve(path) if resolve is not None else path, "rb")
+
+
+def read(f):
+    header = f.read(HEADER_SIZE)
+    if len(header) != HEADER_SIZE or header[:4] != MAGIC:
+        raise ValueError("not a baked texture")
+    width = u16(header, 4)
+    height = u16(header, 6)
+    frames = u16(header, 8)
+    key = Color(u16(header, 12)) if u16(header, 10) & HAS_KEY else None
+
+    texture = TextureResource(width, height, 0, 16)
+    f.readinto(texture.data)
+    return texture, frames, key
+
+
+def load(path, key=None):
+    # Returns (texture, transparent colour). The colour comes from the baked
+    # header, or is the key passed in when falling back to the BMP.
+    try:
+        f = open_file(baked_path(path))
+    except OSError:
+        return TextureResource(path), key
+    with f:
+        texture, frames, baked_key = read(f)
+    return texture, baked_key
+
+
+def load_atlas(path):
+    # Returns (texture, frame names, transparent colour or None)
+    with open_file(path) as f:
+        texture, frames, key = read(f)
+        names = []
+        for _ in range(frames):
+            size = f.read(1)[0]
+            names.append(f.read(size).decode())
+    return texture, names, key
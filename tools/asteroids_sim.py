@@ -0,0 +1,494 @@
+import argparse
+import ast
+import os
+import sys
+import time
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, os.path.join(HERE, "headless"))
+
+import run # Sets up the paths to lib/ and the engine stand-in
+
+import engine
+
+from fixed import ONE, to_fixed, trig_table
+
+# Thousands of Asteroids games stepped at once with NumPy, for tuning the
+# rules (ACCELERATION, TOP_SPEED, the spawn formula, scoring) on big
+# batches of rollouts:
+#
+#     python tools/asteroids_sim.py --games 4096 --steps 2000
+#     python tools/asteroids_sim.py --top-speed 2 --spawn-every 150
+#     python tools/asteroids_sim.py --check
+#
+# It follows Asteroids/main.py step for step in the same Q8.8 fixed point,
+# so the result is exact, not an approximation: same spawns, same hits,
+# same score. Each game is a row in a set of arrays (player, meteroid and
+# bullet slots with counts), and every rule is a masked array operation
+# over all rows.
+#
+# Randomness can't be matched against MicroPython's random module, so both
+# sides use XorShift below, seeded per game. --check swaps it in for the
+# random module of the scalar game running headless (with the governor
+# held at full load), replays the same inputs through both and compares
+# the whole game state after every frame until the ship dies.
+#
+# Parameters default to the constants in Asteroids/main.py and the full
+# limits of its governor knobs.
+
+BUTTONS = ("A", "B", "UP", "DOWN", "LEFT", "RIGHT", "LB", "RB")
+A, B, UP, DOWN, LEFT, RIGHT, LB, RB = (1 << i for i in range(len(BUTTONS)))
+
+SIZES = (2, 4, 4, 6, 6, 6, 8) # Meteroid sizes, as picked in Space.manage_meteroids
+SPAWN_EDGE = 63
+SCREEN_EDGE = 63 * ONE
+WRAP_EDGE = 64 * ONE
+
+
+def game_rules():
+    # Constants and full knob limits, read from the game so they can't drift
+    with open(os.path.join(ROOT, "Asteroids", "main.py")) as f:
+        tree = ast.parse(f.read())
+    rules = {}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Assign) and isinstance(node.value, ast.Constant):
+            for target in node.targets:
+                if isinstance(target, ast.Name) and target.id.isupper():
+                    rules[target.id] = node.value.value
+        elif (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+              and node.func.attr == "add_knob"):
+            name, full = node.args[0].value, node.args[1].value
+            rules["MAX_" + name.upper()] = full
+    rules["SPAWN_BASE"] = 7 # Meteroids on screen at score 0 ...
+    rules["SPAWN_EVERY"] = 200 # ... and one more per this many points
+    return rules
+
+
+def quot(a, b):
+    # fixed.quot over arrays: a / b to the nearest int, same either side of zero
+    return np.sign(a) * ((np.abs(a) + b // 2) // b)
+
+
+def seed_state(seed):
+    return ((seed * 2654435761) ^ 0x9e3779b9) & 0xffffffff or 1
+
+
+class XorShift:
+    # The few calls Asteroids makes on the random module, from a 32-bit
+    # xorshift that is easy to step for a whole batch of games in NumPy
+
+    def __init__(self, seed=0):
+        self.seed(seed)
+
+    def seed(self, seed=0):
+        self.state = seed_state(seed)
+
+    def next(self):
+        x = self.state
+        x ^= (x << 13) & 0xffffffff
+        x ^= x >> 17
+        x ^= (x << 5) & 0xffffffff
+        self.state = x
+        return x
+
+    def random(self):
+        return self.next() / 4294967296
+
+    def uniform(self, a, b):
+        return a + (b - a) * self.random()
+
+    def randint(self, a, b):
+        return a + self.next() % (b - a + 1)
+
+    def choice(self, seq):
+        return seq[self.next() % len(seq)]
+
+
+class Batch:
+    def __init__(self, games, seed=0, rules=None, capacity=32):
+        self.games = games
+        self.rules = rules or game_rules()
+        r = self.rules
+        self.steps_per_turn = 2 * r["ROT_SPEED"]
+        cos_table, sin_table = trig_table(self.steps_per_turn)
+        self.cos = np.array(cos_table, np.int64)
+        self.sin = np.array(sin_table, np.int64)
+        self.max_velocity = to_fixed(r["TOP_SPEED"])
+        bullet_velocity = to_fixed(r["BULLET_SPEED"])
+        self.bullet_vx = quot(self.cos * bullet_velocity, ONE) # fixed.mul
+        self.bullet_vy = -quot(self.sin * bullet_velocity, ONE)
+
+        def zeros(*shape, dtype=np.int64):
+            return np.zeros(shape, dtype)
+
+        self.rng = zeros(games, dtype=np.uint32)
+        self.next_seed = seed + np.arange(games) # Seed of each row's next game
+        self.frame = zeros(games)
+        self.score = zeros(games)
+        self.length = zeros(games) # Frames into the current game
+        self.held = zeros(games) # Buttons held on the last frame
+        self.done = zeros(games, dtype=bool)
+
+        self.px, self.py, self.pvx, self.pvy = (zeros(games) for _ in range(4))
+        self.heading = zeros(games)
+        self.shield = zeros(games, dtype=bool)
+
+        self.mn = zeros(games) # Meteroids per game, in slots 0..mn-1 in list order
+        self.mx, self.my, self.mr, self.msx, self.msy = (zeros(games, capacity) for _ in range(5))
+
+        bullets = self.rules["MAX_BULLETS"]
+        self.bn = zeros(games)
+        self.bx, self.by, self.bvx, self.bvy = (zeros(games, bullets) for _ in range(4))
+        self.bactive = zeros(games, bullets, dtype=bool)
+
+        self.reset(np.arange(games))
+
+    # Random numbers, one per row in rows, same as XorShift.next()
+
+    def draw(self, rows):
+        x = self.rng[rows]
+        x ^= x << np.uint32(13)
+        x ^= x >> np.uint32(17)
+        x ^= x << np.uint32(5)
+        self.rng[rows] = x
+        return x.astype(np.int64)
+
+    def uniform(self, rows, a, b):
+        return a + (b - a) * (self.draw(rows) / 4294967296)
+
+    def randint(self, rows, a, b):
+        return a + self.draw(rows) % (b - a + 1)
+
+    def reset(self, rows):
+        self.rng[rows] = [seed_state(int(s)) for s in self.next_seed[rows]]
+        self.next_seed[rows] += self.games
+        for array in (self.score, self.length, self.held, self.px, self.py, self.pvx,
+                      self.pvy, self.heading, self.mn, self.bn):
+            array[rows] = 0
+        self.frame[rows] = 1 # The governor's frame count on the first frame of play
+        self.shield[rows] = False
+        self.done[rows] = False
+
+    def grow(self):
+        extra = self.mx.shape[1]
+        for name in ("mx", "my", "mr", "msx", "msy"):
+            setattr(self, name, np.pad(getattr(self, name), ((0, 0), (0, extra))))
+
+    def new_meteroids(self, rows):
+        # Meteroid.__init__: colour, side of the screen, speed and direction
+        for _ in range(3):
+            self.draw(rows)
+        axis = self.randint(rows, 0, 1)
+        along = self.uniform(rows, -SPAWN_EDGE, SPAWN_EDGE)
+        edge = np.where(self.draw(rows) % 2 == 0, -SPAWN_EDGE, SPAWN_EDGE)
+        x = np.where(axis == 0, along, edge)
+        y = np.where(axis == 0, edge, along)
+        sx = self.randint(rows, 1, 4) * np.where(x < 0, 1, -1)
+        sy = self.randint(rows, 1, 4) * np.where(y < 0, 1, -1)
+        return np.rint(x * ONE).astype(np.int64), np.rint(y * ONE).astype(np.int64), sx, sy
+
+    def append_meteroids(self, rows, x, y, r, sx, sy):
+        if len(rows) and self.mn[rows].max() >= self.mx.shape[1]:
+            self.grow()
+        slot = self.mn[rows]
+        self.mx[rows, slot] = x
+        self.my[rows, slot] = y
+        self.mr[rows, slot] = r
+        self.msx[rows, slot] = sx
+        self.msy[rows, slot] = sy
+        self.mn[rows] += 1
+
+    def compact(self, gone, names, counts):
+        # Drop the slots marked gone (the first gone.shape[1] of each row),
+        # keeping the rest in order. Only rows that lost something move.
+        rows = np.flatnonzero(gone.any(1))
+        if not len(rows):
+            return
+        width = gone.shape[1]
+        order = np.argsort(gone[rows], axis=1, kind="stable")
+        for name in names:
+            array = getattr(self, name)
+            array[rows, :width] = np.take_along_axis(array[rows, :width], order, 1)
+        counts[rows] -= gone[rows].sum(1)
+
+    def step(self, buttons):
+        """
+        Advance every game that isn't over by one frame with the buttons
+        held (bitmasks of BUTTONS). Returns the rows whose ship died.
+        """
+        r = self.rules
+        buttons = np.asarray(buttons, np.int64)
+        live = ~self.done
+        rows = np.flatnonzero(live)
+
+        # Space.manage_meteroids: spawn, drop the ones off screen, move
+        wanted = np.minimum(self.score // r["SPAWN_EVERY"] + r["SPAWN_BASE"], r["MAX_METEROIDS"])
+        spawn = np.flatnonzero(live & (self.mn <= wanted))
+        if len(spawn):
+            size = np.array(SIZES)[self.draw(spawn) % len(SIZES)]
+            x, y, sx, sy = self.new_meteroids(spawn)
+            self.append_meteroids(spawn, x, y, size, sx, sy)
+
+        # Only the first n slots, enough for the game with the most meteroids
+        n = self.mn.max()
+        slots = np.arange(n)
+        mx, my, mr = self.mx[:, :n], self.my[:, :n], self.mr[:, :n]
+        used = (slots < self.mn[:, None]) & live[:, None]
+        self.compact(used & ((mr <= 0) | (np.abs(mx) > SCREEN_EDGE) | (np.abs(my) > SCREEN_EDGE)),
+                     ("mx", "my", "mr", "msx", "msy"), self.mn)
+        divisor = 8 - np.minimum(self.score // 100, 3)
+        moving = (slots < self.mn[:, None]) & live[:, None]
+        mx += np.where(moving, quot(self.msx[:, :n] * ONE, divisor[:, None]), 0)
+        my += np.where(moving, quot(self.msy[:, :n] * ONE, divisor[:, None]), 0)
+
+        # Player.move
+        self.px[rows] += self.pvx[rows]
+        self.py[rows] += self.pvy[rows]
+        for p in (self.px, self.py):
+            p[:] = np.where(live & (p >= WRAP_EDGE), -SCREEN_EDGE,
+                            np.where(live & (p <= -WRAP_EDGE), SCREEN_EDGE, p))
+
+        # Player.move_bullets
+        m = self.bn.max()
+        bslots = np.arange(m)
+        bx, by = self.bx[:, :m], self.by[:, :m]
+        used = (bslots < self.bn[:, None]) & live[:, None]
+        self.compact(used & (~self.bactive[:, :m] | (np.abs(bx) > SCREEN_EDGE)
+                             | (np.abs(by) > SCREEN_EDGE)),
+                     ("bx", "by", "bvx", "bvy", "bactive"), self.bn)
+        moving = (bslots < self.bn[:, None]) & live[:, None]
+        bx += np.where(moving, self.bvx[:, :m], 0)
+        by += np.where(moving, self.bvy[:, :m], 0)
+
+        # Shield drain
+        self.shield &= ~(live & (self.score <= 0))
+        drain = live & self.shield
+        self.score = np.where(drain, np.maximum(self.score - 1 - (self.frame & 1), 0), self.score)
+
+        # check_collisions: the ship first, unless shielded. The kernels' box
+        # test is only there to keep their squares small, dx*dx + dy*dy < r*r
+        # implies it.
+        radius = np.where(slots < self.mn[:, None], mr * ONE, 0)
+        dx = mx - self.px[:, None]
+        dy = my - self.py[:, None]
+        died = live & ~self.shield & (dx * dx + dy * dy < radius * radius).any(1)
+        live &= ~died
+
+        # ... then the first meteroid (then bullet) with a bullet inside it.
+        # Each live bullet is tested against the meteroids of its own game.
+        owner, j = np.nonzero((bslots < self.bn[:, None]) & live[:, None])
+        if len(owner):
+            n = self.mn[owner].max()
+            radius = np.where(slots[:n] < self.mn[owner, None], self.mr[owner, :n] * ONE, 0)
+            dx = self.mx[owner, :n] - self.bx[owner, j][:, None]
+            dy = self.my[owner, :n] - self.by[owner, j][:, None]
+            k, i = np.nonzero(dx * dx + dy * dy < radius * radius)
+            if len(k):
+                # Lowest (meteroid, bullet) per game, like the kernel's loop order
+                games, first = owner[k], i * 256 + j[k]
+                order = np.lexsort((first, games))
+                games, first = games[order], first[order]
+                lead = np.ones(len(games), bool)
+                lead[1:] = games[1:] != games[:-1]
+                hit, i, j = games[lead], first[lead] >> 8, first[lead] & 0xff
+                self.explode(hit, i)
+                self.bactive[hit, j] = False
+                self.score[hit] += (10 - self.mr[hit, i]) * 10
+
+        # Turning, thrust, then the presses since the last frame
+        turn = (np.where(buttons & (LEFT | LB), 1, 0) - np.where(buttons & (RIGHT | RB), 1, 0))
+        self.heading = np.where(live, (self.heading + turn) % self.steps_per_turn, self.heading)
+        thrust = np.flatnonzero(live & (buttons & UP != 0))
+        h = self.heading[thrust]
+        self.pvx[thrust] = np.clip(self.pvx[thrust] + quot(self.cos[h], r["ACCELERATION"]),
+                                   -self.max_velocity, self.max_velocity)
+        self.pvy[thrust] = np.clip(self.pvy[thrust] - quot(self.sin[h], r["ACCELERATION"]),
+                                   -self.max_velocity, self.max_velocity)
+
+        pressed = buttons & ~self.held
+        released = ~buttons & self.held
+        shoot = np.flatnonzero(live & (pressed & A != 0) & (self.bn < r["MAX_BULLETS"]))
+        slot = self.bn[shoot]
+        self.bx[shoot, slot] = self.px[shoot]
+        self.by[shoot, slot] = self.py[shoot]
+        self.bvx[shoot, slot] = self.bullet_vx[self.heading[shoot]]
+        self.bvy[shoot, slot] = self.bullet_vy[self.heading[shoot]]
+        self.bactive[shoot, slot] = True
+        self.bn[shoot] += 1
+        self.shield |= live & (pressed & B != 0) & (self.score > 0)
+        self.shield &= ~(live & (released & B != 0))
+
+        self.held = buttons
+        self.frame += ~self.done
+        self.length += ~self.done
+        self.done |= died
+        return np.flatnonzero(died)
+
+    def explode(self, rows, i):
+        # Meteroid.explode, and Space.split_meteroid adding the clone
+        radius = self.mr[rows, i] - 2
+        self.mr[rows, i] = radius
+        self.msx[rows, i] = self.randint(rows, 1, 4) * np.where(self.mx[rows, i] < 0, 1, -1)
+        self.msy[rows, i] = self.randint(rows, 1, 4) * np.where(self.my[rows, i] < 0, 1, -1)
+        split = radius > 0
+        clones = rows[split]
+        if len(clones):
+            _, _, sx, sy = self.new_meteroids(clones) # The clone keeps its own slopes
+            self.append_meteroids(clones, self.mx[clones, i[split]], self.my[clones, i[split]],
+                                  radius[split], sx, sy)
+
+    def state(self, row):
+        # One game's state, in the same shape as scalar_state()
+        n, m = self.mn[row], self.bn[row]
+        return {
+            "score": int(self.score[row]),
+            "player": (int(self.px[row]), int(self.py[row]), int(self.pvx[row]),
+                       int(self.pvy[row]), int(self.heading[row]), bool(self.shield[row])),
+            "meteroids": [tuple(int(a[row, k]) for a in (self.mx, self.my, self.mr, self.msx, self.msy))
+                          for k in range(n)],
+            "bullets": [(int(self.bx[row, k]), int(self.by[row, k]), bool(self.bactive[row, k]))
+                        for k in range(m)],
+        }
+
+
+def scalar_state(namespace):
+    player = namespace["player"]
+    body = player.body
+    return {
+        "score": namespace["score"],
+        "player": (body.x, body.y, body.vx, body.vy, player.heading, player.shield),
+        "meteroids": [(m.body.x, m.body.y, m.sprite.radius, m.slopes[0], m.slopes[1])
+                      for m in namespace["game"].meteroids],
+        "bullets": [(b.body.x, b.body.y, b.active) for b in player.bullets],
+    }
+
+
+def random_buttons(rng, games, steps):
+    # Held buttons per frame: mostly thrusting, turning and shooting
+    odds = {A: 0.35, B: 0.05, UP: 0.4, LEFT: 0.25, RIGHT: 0.25, LB: 0.02, RB: 0.02}
+    buttons = np.zeros((steps, games), np.int64)
+    for bit, p in odds.items():
+        buttons |= np.where(rng.random((steps, games)) < p, bit, 0)
+    return buttons
+
+
+def run_scalar(seed, buttons):
+    # Asteroids/main.py headless with XorShift as its random module. Returns
+    # the state before each frame, up to and including the one it died on.
+    states = []
+
+    def source(frame):
+        held = buttons[frame - 1] if frame - 1 < len(buttons) else 0
+        return [name for i, name in enumerate(BUTTONS) if held & (1 << i)]
+
+    def watch(frame, namespace):
+        if frame == 1:
+            namespace["governor"].hold() # Full meteroid and bullet caps throughout
+        if namespace["menu"]:
+            states.append(None) # Died on the frame before
+            raise engine.HeadlessExit(frame)
+        states.append(scalar_state(namespace))
+
+    saved = sys.modules["random"]
+    sys.modules["random"] = XorShift(seed)
+    try:
+        run.run_game("Asteroids", len(buttons) + 1, source, on_frame=watch)
+    finally:
+        sys.modules["random"] = saved
+    return states
+
+
+def check(games, steps, seed):
+    rng = np.random.default_rng(seed)
+    buttons = random_buttons(rng, games, steps)
+    batch = Batch(games, seed)
+    expected = [run_scalar(seed + k, buttons[:, k]) for k in range(games)]
+
+    failures = 0
+    deaths = 0
+    compared = 0
+    for t in range(steps + 1):
+        for k in range(games):
+            if t >= len(expected[k]) or (t > 0 and expected[k][t - 1] is None):
+                continue
+            want = expected[k][t]
+            if want is None:
+                deaths += 1
+                if not batch.done[k]:
+                    failures += 1
+                    print(f"game {k} frame {t}: the scalar game died, the batch didn't")
+                continue
+            got = batch.state(k)
+            compared += 1
+            if batch.done[k] or got != want:
+                failures += 1
+                expected[k][t + 1:] = [] # Report each game's first difference only
+                print(f"game {k} frame {t}: differs")
+                for key in want:
+                    if got[key] != want[key]:
+                        print(f"  {key}: scalar {want[key]}")
+                        print(f"  {key}: batch  {got[key]}")
+        if t < steps:
+            batch.step(buttons[t])
+    print(f"compared {compared} frames of {games} games ({deaths} deaths), "
+          f"{failures} differences")
+    return failures == 0
+
+
+def rollout(batch, steps, seed):
+    rng = np.random.default_rng(seed)
+    buttons = random_buttons(rng, batch.games, 256) # Cycled, making them is slower than stepping
+    scores = []
+    lengths = []
+    start = time.perf_counter()
+    for t in range(steps):
+        died = batch.step(buttons[t % len(buttons)])
+        if len(died):
+            scores.extend(batch.score[died].tolist())
+            lengths.extend(batch.length[died].tolist())
+            batch.reset(died)
+    elapsed = time.perf_counter() - start
+    return elapsed, np.array(scores), np.array(lengths)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Step many Asteroids games at once with NumPy.")
+    parser.add_argument("--games", type=int, default=4096)
+    parser.add_argument("--steps", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--check", action="store_true",
+                        help="compare against Asteroids/main.py run headless on the same inputs")
+    parser.add_argument("--acceleration", type=int, help="lower is faster")
+    parser.add_argument("--top-speed", type=float, help="pixels per frame")
+    parser.add_argument("--bullet-speed", type=float, help="pixels per frame")
+    parser.add_argument("--spawn-base", type=int, help="meteroids on screen at score 0")
+    parser.add_argument("--spawn-every", type=int, help="points per extra meteroid")
+    parser.add_argument("--max-meteroids", type=int)
+    args = parser.parse_args()
+
+    if args.check:
+        games = min(args.games, 32)
+        steps = min(args.steps, 600)
+        sys.exit(0 if check(games, steps, args.seed) else 1)
+
+    rules = game_rules()
+    for name in ("acceleration", "top_speed", "bullet_speed", "spawn_base", "spawn_every",
+                 "max_meteroids"):
+        if getattr(args, name) is not None:
+            rules[name.upper()] = getattr(args, name)
+
+    batch = Batch(args.games, args.seed, rules)
+    elapsed, scores, lengths = rollout(batch, args.steps, args.seed)
+    print(f"{args.games} games x {args.steps} steps in {elapsed:.2f} s: "
+          f"{args.games * args.steps / elapsed:,.0f} env-steps/s")
+    if len(scores):
+        print(f"{len(scores)} games over: score mean {scores.mean():.0f}, "
+              f"p50 {np.percentile(scores, 50):.0f}, p90 {np.percentile(scores, 90):.0f}; "
+              f"length mean {lengths.mean():.0f} frames")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import argparse
+import os
+import struct
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, os.path.join(HERE, "headless"))
+
+from engine_resources import read_bmp
+
+# Bakes a game's sprite BMPs into .tex files in the engine's own pixel format
+# (see lib/textures.py for the layout), next to the BMPs. Run it again
+# whenever a BMP changes. icon.bmp is left alone, the launcher reads it.
+#
+# Sprites of games listed in KEYS are drawn with a transparent colour. Any
+# pixel within --tolerance of it is snapped to exactly that colour, and the
+# colour goes in the header so the game doesn't have to know it.
+
+GAMES = ("Asteroids", "BitFlip", "FroggyRoad")
+KEYS = {"FroggyRoad": 0xFFFF} # White
+SKIP = ("icon.bmp",)
+
+MAGIC = b"TCT1"
+HAS_KEY = 1
+
+
+def rgb565_distance(a, b):
+    # Largest per-channel difference, in 5-bit steps
+    return max(abs((a >> 11) - (b >> 11)),
+               abs(((a >> 5) & 63) - ((b >> 5) & 63)) // 2,
+               abs((a & 31) - (b & 31)))
+
+
+def apply_key(pixels, key, tolerance):
+    values = list(struct.unpack(f"<{len(pixels) // 2}H", pixels))
+    for i, value in enumerate(values):
+        if rgb565_distance(value, key) <= tolerance:
+            values[i] = key
+    return struct.pack(f"<{len(values)}H", *values)
+
+
+def header(width, height, frames, key):
+    flags = HAS_KEY if key is not None else 0
+    return MAGIC + struct.pack("<HHHHHH", width, height, frames, flags,
+                               key if key is not None else 0, 0)
+
+
+def pack_atlas(sprites, key):
+    # Sprites side by side in equal cells, each centred, padded with the key
+    cell_w = max(w for _, w, _, _ in sprites)
+    cell_h = max(h for _, _, h, _ in sprites)
+    fill = struct.pack("<H", key if key is not None else 0)
+    rows = [bytearray(fill * (cell_w * len(sprites))) for _ in range(cell_h)]
+    for index, (_, w, h, pixels) in enumerate(sprites):
+        left = index * cell_w + (cell_w - w) // 2
+        top = (cell_h - h) // 2
+        for y in range(h):
+            rows[top + y][left * 2:(left + w) * 2] = pixels[y * w * 2:(y + 1) * w * 2]
+    table = b"".join(bytes([len(name)]) + name.encode() for name, _, _, _ in sprites)
+    return cell_w * len(sprites), cell_h, b"".join(rows), table
+
+
+def bake(game, atlas=False, tolerance=0):
+    folder = os.path.join(ROOT, game)
+    key = KEYS.get(game)
+    sprites = []
+    for name in sorted(os.listdir(folder)):
+        if not name.endswith(".bmp") or name in SKIP:
+            continue
+        width, height, pixels = read_bmp(os.path.join(folder, name))
+        if key is not None:
+            pixels = apply_key(pixels, key, tolerance)
+        out = os.path.join(folder, name[:-4] + ".tex")
+        with open(out, "wb") as f:
+            f.write(header(width, height, 1, key))
+            f.write(pixels)
+        print(f"{os.path.relpath(out, ROOT)}: {width}x{height}")
+        sprites.append((name[:-4], width, height, pixels))
+
+    if atlas and len(sprites) > 1:
+        width, height, pixels, table = pack_atlas(sprites, key)
+        out = os.path.join(folder, "atlas.tex")
+        with open(out, "wb") as f:
+            f.write(header(width, height, len(sprites), key))
+            f.write(pixels)
+            f.write(table)
+        print(f"{os.path.relpath(out, ROOT)}: {width}x{height}, "
+              f"{len(sprites)} frames ({', '.join(s[0] for s in sprites)})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bake sprite BMPs into .tex textures.")
+    parser.add_argument("games", nargs="*", help=f"games to bake (default: all of {', '.join(GAMES)})")
+    parser.add_argument("--atlas", action="store_true",
+                        help="also pack each game's sprites into one atlas.tex")
+    parser.add_argument("--tolerance", type=int, default=0,
+                        help="snap pixels this close (in 5-bit steps) to the transparent colour")
+    args = parser.parse_args()
+    for game in args.games:
+        if game not in GAMES:
+            parser.error(f"unknown game {game}")
+    for game in args.games or GAMES:
+        bake(game, args.atlas, args.tolerance)
+
+
+if __name__ == "__main__":
+    main()
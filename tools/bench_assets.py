@@ -0,0 +1,53 @@
+# Times loading each sprite from its BMP against its baked .tex.
+#
+# On the Thumby Color, with the games in /Games and lib/ in /lib:
+#     mpremote run tools/bench_assets.py
+# On a PC it runs against the headless engine stand-in:
+#     python tools/bench_assets.py
+import sys
+
+if sys.implementation.name != "micropython":
+    import os
+    here = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, os.path.join(here, "..", "lib"))
+    sys.path.insert(0, os.path.join(here, "headless"))
+    import engine_resources
+    import textures
+    textures.resolve = engine_resources.resolve
+
+import gc
+
+from engine_resources import TextureResource
+
+import textures
+from clock import ticks_us, ticks_diff
+
+ROUNDS = 20
+SPRITES = ("/Games/Asteroids/spaceship.bmp", "/Games/FroggyRoad/frog.bmp",
+           "/Games/FroggyRoad/car.bmp", "/Games/FroggyRoad/log.bmp",
+           "/Games/FroggyRoad/lily.bmp")
+
+
+def time_load(load, path):
+    gc.collect()
+    start = ticks_us()
+    for _ in range(ROUNDS):
+        load(path)
+    return ticks_diff(ticks_us(), start) / ROUNDS
+
+
+def main():
+    print("sprite                 bmp us    baked us   speedup")
+    for path in SPRITES:
+        try:
+            textures.open_file(textures.baked_path(path)).close()
+        except OSError:
+            print("%-20s not baked, run tools/bake_assets.py" % path.split("/")[-1])
+            continue
+        bmp_us = time_load(TextureResource, path)
+        baked_us = time_load(textures.load, path)
+        print("%-20s %9.1f %11.1f %8.1fx" % (path.split("/")[-1], bmp_us, baked_us,
+                                             bmp_us / baked_us))
+
+
+main()
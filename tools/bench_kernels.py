@@ -0,0 +1,88 @@
+# Times the Python and fast (viper) kernels on identical inputs.
+#
+# On the Thumby Color, with lib/ copied to /lib:
+#     mpremote run tools/bench_kernels.py
+# On a PC only the Python path exists, so that is all it times:
+#     python tools/bench_kernels.py
+import sys
+
+if sys.implementation.name != "micropython":
+    import os
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lib"))
+
+from array import array
+
+import kernels
+from clock import ticks_us, ticks_diff
+
+ROUNDS = 200
+
+
+class Lcg:
+    # Same numbers on every platform, unlike random
+    def __init__(self, seed):
+        self.state = seed
+
+    def next(self, low, high):
+        self.state = (self.state * 1103515245 + 12345) & 0x7fffffff
+        return low + self.state % (high - low + 1)
+
+
+def make_inputs():
+    rng = Lcg(1)
+    n, m = 20, 12
+    xs = array("i", [rng.next(-16128, 16128) for _ in range(n)])
+    ys = array("i", [rng.next(-16128, 16128) for _ in range(n)])
+    rs = array("i", [rng.next(1, 4) * 512 for _ in range(n)])
+    px = array("i", [rng.next(-16128, 16128) for _ in range(m)])
+    py = array("i", [rng.next(-16128, 16128) for _ in range(m)])
+    lefts = array("i", [rng.next(-16384, 16384) for _ in range(6)])
+    rights = array("i", [lefts[i] + rng.next(1280, 6400) for i in range(6)])
+    cells = bytearray(rng.next(0, 3) for _ in range(64))
+    return n, m, xs, ys, rs, px, py, lefts, rights, cells
+
+
+def run(name, fn, args_list):
+    results = []
+    start = ticks_us()
+    for _ in range(ROUNDS):
+        for args in args_list:
+            results.append(fn(*args))
+    elapsed = ticks_diff(ticks_us(), start)
+    return results, elapsed / (ROUNDS * len(args_list))
+
+
+def cases():
+    n, m, xs, ys, rs, px, py, lefts, rights, cells = make_inputs()
+    points = [(px[j], py[j]) for j in range(m)]
+    return [
+        ("first_circle_hit",
+         [(x, y, xs, ys, rs, n) for x, y in points]),
+        ("first_circle_pair",
+         [(xs, ys, rs, n, px, py, m)]),
+        ("first_overlap",
+         [(x - 1280, x + 1280, lefts, rights, 6) for x, _ in points]),
+        ("first_inside",
+         [(x, lefts, rights, 6) for x, _ in points]),
+        # Forward then back, so every round starts from the same board
+        ("swap_block",
+         [(cells, 8, x, y, f, 3) for x in range(8) for y in range(8) for f in (1, 0)]),
+    ]
+
+
+def main():
+    print("fast path:", "viper" if kernels.FAST else "not available")
+    print("kernel               python us   fast us   speedup")
+    for name, args_list in cases():
+        slow, slow_us = run(name, getattr(kernels, "py_" + name), args_list)
+        line = "%-19s %10.2f" % (name, slow_us)
+        if kernels.FAST:
+            fast, fast_us = run(name, getattr(kernels, name), args_list)
+            if fast != slow:
+                line += "   MISMATCH"
+            else:
+                line += " %9.2f %8.1fx" % (fast_us, slow_us / fast_us)
+        print(line)
+
+
+main()
@@ -0,0 +1,53 @@
+import engine_animation
+import engine_io
+import engine_nodes
+import engine_save
+
+
+class HeadlessExit(Exception):
+    # Raised by tick() once max_frames have run
+    pass
+
+
+fps = 60
+frame = 0
+max_frames = None
+renderer = None # Called with the live nodes at every frame
+on_frame = None # Called with the frame number after inputs are updated
+
+
+def fps_limit(limit):
+    global fps
+    fps = limit
+
+
+def get_running_fps():
+    return fps
+
+
+def tick():
+    global frame
+    if max_frames is not None and frame >= max_frames:
+        raise HeadlessExit(frame)
+    engine_nodes.collect()
+    if renderer is not None:
+        renderer(engine_nodes.live)
+    frame += 1
+    engine_io.update(frame)
+    engine_animation.run_due()
+    if on_frame is not None:
+        on_frame(frame)
+    return True
+
+
+def reset():
+    global fps, frame, max_frames, renderer, on_frame
+    fps = 60
+    frame = 0
+    max_frames = None
+    renderer = None
+    on_frame = None
+    engine_io.reset()
+    engine_nodes.reset()
+    engine_animation.reset()
+    engine_save.reset()
@@ -0,0 +1,26 @@
+import engine
+
+# Pending callbacks, run by engine.tick() once their frame is reached
+pending = []
+
+
+class Delay:
+    def __init__(self):
+        self.finished = False
+
+    def start(self, delay, callback):
+        frames = max(1, round(delay * engine.fps / 1000))
+        pending.append((engine.frame + frames, self, callback))
+
+
+def run_due():
+    due = [p for p in pending if p[0] <= engine.frame]
+    for p in due:
+        pending.remove(p)
+    for _, delay, callback in due:
+        delay.finished = True
+        callback()
+
+
+def reset():
+    pending.clear()
@@ -0,0 +1,40 @@
+class Color:
+    def __init__(self, r=0.0, g=None, b=None):
+        if isinstance(r, Color):
+            r, g, b = r.r, r.g, r.b
+        elif g is None and isinstance(r, int):
+            # Packed RGB565
+            r, g, b = ((r >> 11) & 31) / 31, ((r >> 5) & 63) / 63, (r & 31) / 31
+        elif g is None:
+            g = b = 0.0
+        self.r = float(r)
+        self.g = float(g)
+        self.b = float(b)
+
+    @property
+    def value(self):
+        return (round(self.r * 31) << 11) | (round(self.g * 63) << 5) | round(self.b * 31)
+
+    def __eq__(self, other):
+        return isinstance(other, Color) and self.value == other.value
+
+    def __hash__(self):
+        return self.value
+
+    def __repr__(self):
+        return f"Color({self.r:.3f}, {self.g:.3f}, {self.b:.3f})"
+
+
+black = Color(0, 0, 0)
+white = Color(1, 1, 1)
+red = Color(1, 0, 0)
+green = Color(0, 1, 0)
+blue = Color(0, 0, 1)
+yellow = Color(1, 1, 0)
+orange = Color(1, 0.65, 0)
+purple = Color(0.5, 0, 0.5)
+brown = Color(0.65, 0.16, 0.16)
+darkgrey = Color(0.25, 0.25, 0.25)
+lightgrey = Color(0.75, 0.75, 0.75)
+silver = Color(0.75, 0.75, 0.75)
+skyblue = Color(0.53, 0.81, 0.92)
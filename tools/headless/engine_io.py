@@ -0,0 +1,59 @@
+# Buttons are driven by input_source(frame), which returns the names of the
+# buttons held during that frame. The runner installs one from a script.
+input_source = None
+rumble_level = 0
+
+
+class Button:
+    def __init__(self, name):
+        self.name = name
+        self.down = False
+        self.was_down = False
+
+    @property
+    def is_pressed(self):
+        return self.down
+
+    @property
+    def is_just_pressed(self):
+        return self.down and not self.was_down
+
+    @property
+    def is_just_released(self):
+        return self.was_down and not self.down
+
+    def set(self, down):
+        self.was_down = self.down
+        self.down = down
+
+
+A = Button("A")
+B = Button("B")
+UP = Button("UP")
+DOWN = Button("DOWN")
+LEFT = Button("LEFT")
+RIGHT = Button("RIGHT")
+LB = Button("LB")
+RB = Button("RB")
+MENU = Button("MENU")
+BUTTONS = (A, B, UP, DOWN, LEFT, RIGHT, LB, RB, MENU)
+
+
+def update(frame):
+    held = input_source(frame) if input_source is not None else ()
+    for button in BUTTONS:
+        button.set(button.name in held)
+
+
+def rumble(level):
+    global rumble_level
+    rumble_level = level
+
+
+def reset():
+    global input_source, rumble_level
+    input_source = None
+    rumble_level = 0
+    for button in BUTTONS:
+        button.down = False
+        button.was_down = False
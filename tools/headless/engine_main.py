@@ -0,0 +1 @@
+# Headless stand-in: importing engine_main starts the engine on the device.
@@ -0,0 +1,16 @@
+class Vector2:
+    def __init__(self, x=0, y=0):
+        self.x = x
+        self.y = y
+
+    def __add__(self, other):
+        return Vector2(self.x + other.x, self.y + other.y)
+
+    def __sub__(self, other):
+        return Vector2(self.x - other.x, self.y - other.y)
+
+    def __mul__(self, k):
+        return Vector2(self.x * k, self.y * k)
+
+    def __repr__(self):
+        return f"Vector2({self.x}, {self.y})"
@@ -0,0 +1,88 @@
+from engine_draw import Color
+from engine_math import Vector2
+
+# Every node stays alive until it is destroyed, like on the device
+live = []
+created = 0
+destroyed = 0
+
+
+def collect():
+    global destroyed
+    before = len(live)
+    live[:] = [n for n in live if not n.marked]
+    destroyed += before - len(live)
+
+
+def reset():
+    global created, destroyed
+    live.clear()
+    created = 0
+    destroyed = 0
+
+
+class Node:
+    # Positional argument order of the device constructor
+    ARGS = ()
+    DEFAULTS = {}
+
+    def __init__(self, *args, **kwargs):
+        global created
+        values = dict(self.DEFAULTS)
+        for name, value in zip(self.ARGS, args):
+            values[name] = value
+        values.update(kwargs)
+        if not isinstance(values.get("position"), Vector2):
+            values["position"] = Vector2(0, 0)
+        for name, value in values.items():
+            setattr(self, name, value)
+        self.marked = False
+        live.append(self)
+        created += 1
+
+    def mark_destroy(self):
+        self.marked = True
+
+    def destroy(self):
+        self.marked = True
+        collect()
+
+
+class EmptyNode(Node):
+    ARGS = ("position",)
+    DEFAULTS = {"layer": 0}
+
+
+class CameraNode(Node):
+    ARGS = ("position", "zoom", "viewport", "rotation", "layer")
+    DEFAULTS = {"zoom": 1, "rotation": 0, "layer": 0}
+
+
+class Rectangle2DNode(Node):
+    ARGS = ("position", "width", "height", "color", "opacity", "outline",
+            "rotation", "scale", "layer")
+    DEFAULTS = {"width": 10, "height": 10, "color": Color(1, 1, 1), "opacity": 1.0,
+                "outline": False, "rotation": 0, "layer": 0}
+
+
+class Circle2DNode(Node):
+    ARGS = ("position", "radius", "color", "opacity", "outline", "scale", "layer")
+    DEFAULTS = {"radius": 5, "color": Color(1, 1, 1), "opacity": 1.0,
+                "outline": False, "layer": 0}
+
+
+class Sprite2DNode(Node):
+    ARGS = ("position", "texture", "transparent_color", "fps", "frame_count_x",
+            "frame_count_y", "rotation", "scale", "opacity", "playing", "layer")
+    DEFAULTS = {"texture": None, "transparent_color": None, "fps": 30,
+                "frame_count_x": 1, "frame_count_y": 1, "frame_current_x": 0,
+                "frame_current_y": 0, "rotation": 0, "opacity": 1.0,
+                "playing": True, "layer": 0}
+
+
+class Text2DNode(Node):
+    ARGS = ("position", "font", "text", "rotation", "scale", "opacity",
+            "letter_spacing", "line_spacing", "color", "layer")
+    DEFAULTS = {"font": None, "text": "", "rotation": 0, "opacity": 1.0,
+                "letter_spacing": 0, "line_spacing": 0, "color": Color(1, 1, 1),
+                "layer": 0}
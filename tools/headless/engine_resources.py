@@ -0,0 +1,66 @@
+import os
+import struct
+
+# Device paths like /Games/Asteroids/ship.bmp resolve against root,
+# /lib/... against lib_root. Set by the runner.
+root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+lib_root = os.path.join(root, "lib")
+loads = 0 # Number of textures loaded from files
+
+
+def resolve(path):
+    if path.startswith("/Games/"):
+        return os.path.join(root, path[len("/Games/"):])
+    if path.startswith("/lib/"):
+        return os.path.join(lib_root, path[len("/lib/"):])
+    return path
+
+
+def read_bmp(path):
+    # Returns (width, height, RGB565 little-endian pixels, top row first)
+    with open(path, "rb") as f:
+        raw = f.read()
+    if raw[:2] != b"BM":
+        raise ValueError(f"{path} is not a BMP file")
+    offset = struct.unpack_from("<I", raw, 10)[0]
+    width, height = struct.unpack_from("<ii", raw, 18)
+    bpp = struct.unpack_from("<H", raw, 28)[0]
+    top_down = height < 0
+    height = abs(height)
+    stride = (width * bpp // 8 + 3) & ~3
+
+    pixels = bytearray(width * height * 2)
+    for row in range(height):
+        src = offset + (row if top_down else height - 1 - row) * stride
+        dst = row * width * 2
+        if bpp == 16:
+            pixels[dst:dst + width * 2] = raw[src:src + width * 2]
+        elif bpp in (24, 32):
+            step = bpp // 8
+            for x in range(width):
+                b, g, r = raw[src + x * step:src + x * step + 3]
+                value = ((r >> 3) << 11) | ((g >> 2) << 5) | (b >> 3)
+                struct.pack_into("<H", pixels, dst + x * 2, value)
+        else:
+            raise ValueError(f"{path}: {bpp} bits per pixel is not supported")
+    return width, height, pixels
+
+
+class TextureResource:
+    def __init__(self, path_or_width, height=None, color=0, bit_depth=16, in_ram=False):
+        global loads
+        if isinstance(path_or_width, str):
+            self.path = path_or_width
+            self.width, self.height, self.data = read_bmp(resolve(path_or_width))
+            loads += 1
+        else:
+            self.path = None
+            self.width = path_or_width
+            self.height = height
+            self.data = bytearray(struct.pack("<H", color) * (path_or_width * height))
+        self.bit_depth = bit_depth
+
+
+class FontResource:
+    def __init__(self, path=None):
+        self.path = path
@@ -0,0 +1,23 @@
+# In-memory saves, reset with engine.reset()
+location = None
+saves = {}
+
+
+def set_location(path):
+    global location
+    location = path
+    saves.setdefault(path, {})
+
+
+def load(key, default=None):
+    return saves.get(location, {}).get(key, default)
+
+
+def save(key, value):
+    saves.setdefault(location, {})[key] = value
+
+
+def reset():
+    global location
+    location = None
+    saves.clear()
@@ -0,0 +1,270 @@
+import math
+
+import numpy as np
+
+import engine_nodes
+
+# Software renderer for the headless engine.
+#
+# Draws the live node tree into a 128x128 RGB float framebuffer in layer
+# order (creation order within a layer), blending by opacity. Alongside the
+# image it counts fills: how many times each pixel was written (overdraw),
+# how many pixels each layer and node type filled, and how many of those
+# fills were completely covered later by an opaque fill (hidden).
+#
+# Text is drawn as one solid cell per glyph, which is what matters for fill
+# counts; the glyph shapes themselves are not reproduced.
+
+WIDTH = 128
+HEIGHT = 128
+LAYERS = 8
+GLYPH_WIDTH = 5
+GLYPH_HEIGHT = 7
+
+
+def rgb565_to_rgb(values):
+    r = ((values >> 11) & 31) / 31
+    g = ((values >> 5) & 63) / 63
+    b = (values & 31) / 31
+    return np.stack((r, g, b), axis=-1).astype(np.float32)
+
+
+class Rasterizer:
+    def __init__(self, width=WIDTH, height=HEIGHT):
+        self.width = width
+        self.height = height
+        self.framebuffer = np.zeros((height, width, 3), np.float32)
+        self.textures = {}
+
+        # Totals over every frame rendered
+        self.frames = 0
+        self.overdraw_total = np.zeros((height, width), np.int64)
+        self.layer_fills = np.zeros(LAYERS, np.int64)
+        self.layer_hidden = np.zeros(LAYERS, np.int64)
+        self.type_fills = {}
+        self.type_nodes = {}
+
+    def __call__(self, nodes):
+        self.render(nodes)
+
+    def render(self, nodes):
+        self.framebuffer[:] = 0
+        self.overdraw = np.zeros((self.height, self.width), np.int32)
+        # Fills per layer since the last opaque write to each pixel
+        self.pending = np.zeros((LAYERS, self.height, self.width), np.int32)
+
+        cx, cy = 0, 0
+        for node in nodes:
+            if isinstance(node, engine_nodes.CameraNode):
+                cx, cy = node.position.x, node.position.y
+                break
+        self.origin = (self.width / 2 - cx, self.height / 2 - cy)
+
+        drawable = [n for n in nodes if not isinstance(n, engine_nodes.CameraNode)]
+        drawable.sort(key=lambda n: n.layer) # Stable, so creation order is kept
+        for node in drawable:
+            self.draw(node)
+
+        self.frames += 1
+        self.overdraw_total += self.overdraw
+        return self.framebuffer
+
+    def draw(self, node):
+        opacity = getattr(node, "opacity", 1.0)
+        if opacity <= 0:
+            return
+        if isinstance(node, engine_nodes.Rectangle2DNode):
+            shape = self.rectangle(node)
+        elif isinstance(node, engine_nodes.Circle2DNode):
+            shape = self.circle(node)
+        elif isinstance(node, engine_nodes.Sprite2DNode):
+            shape = self.sprite(node)
+        elif isinstance(node, engine_nodes.Text2DNode):
+            shape = self.text(node)
+        else:
+            return
+        if shape is None:
+            return
+        y0, x0, mask, colors = shape
+        self.fill(node, y0, x0, mask, colors, opacity)
+
+    def fill(self, node, y0, x0, mask, colors, opacity):
+        # Clip the shape's box to the screen
+        h, w = mask.shape
+        top, left = max(y0, 0), max(x0, 0)
+        bottom, right = min(y0 + h, self.height), min(x0 + w, self.width)
+        if top >= bottom or left >= right:
+            return
+        mask = mask[top - y0:bottom - y0, left - x0:right - x0]
+        if colors.ndim == 3:
+            colors = colors[top - y0:bottom - y0, left - x0:right - x0]
+        count = int(mask.sum())
+        if count == 0:
+            return
+
+        region = (slice(top, bottom), slice(left, right))
+        layer = max(0, min(int(node.layer), LAYERS - 1))
+        fb = self.framebuffer[region]
+        if colors.ndim == 3:
+            fb[mask] = fb[mask] * (1 - opacity) + colors[mask] * opacity
+        else:
+            fb[mask] = fb[mask] * (1 - opacity) + colors * opacity
+
+        self.overdraw[region][mask] += 1
+        pending = self.pending[(slice(None),) + region]
+        if opacity >= 1:
+            # Everything under an opaque fill is hidden, charged to its own layer
+            self.layer_hidden += pending[:, mask].sum(axis=1)
+            pending[:, mask] = 0
+        pending[layer][mask] += 1
+
+        kind = type(node).__name__
+        for base in type(node).__mro__:
+            if base.__module__ == "engine_nodes":
+                kind = base.__name__
+                break
+        self.layer_fills[layer] += count
+        self.type_fills[kind] = self.type_fills.get(kind, 0) + count
+        self.type_nodes[kind] = self.type_nodes.get(kind, 0) + 1
+
+    def grid(self, cx, cy, half_w, half_h):
+        # Pixel centres around a screen point, as offsets from it
+        x0 = math.floor(cx - half_w)
+        y0 = math.floor(cy - half_h)
+        x1 = math.ceil(cx + half_w) + 1
+        y1 = math.ceil(cy + half_h) + 1
+        xs = np.arange(x0, x1) + 0.5 - cx
+        ys = np.arange(y0, y1) + 0.5 - cy
+        return y0, x0, xs[None, :], ys[:, None]
+
+    def screen(self, position):
+        return position.x + self.origin[0], position.y + self.origin[1]
+
+    def color(self, color):
+        return np.array((color.r, color.g, color.b), np.float32)
+
+    def rectangle(self, node):
+        cx, cy = self.screen(node.position)
+        w, h = node.width, node.height
+        reach = math.hypot(w, h) / 2
+        y0, x0, xs, ys = self.grid(cx, cy, reach, reach)
+        c, s = math.cos(node.rotation), math.sin(node.rotation)
+        u = xs * c - ys * s
+        v = xs * s + ys * c
+        mask = (np.abs(u) < w / 2) & (np.abs(v) < h / 2)
+        if node.outline:
+            mask &= (np.abs(u) >= w / 2 - 1) | (np.abs(v) >= h / 2 - 1)
+        return y0, x0, mask, self.color(node.color)
+
+    def circle(self, node):
+        cx, cy = self.screen(node.position)
+        r = node.radius
+        y0, x0, xs, ys = self.grid(cx, cy, r, r)
+        d2 = xs * xs + ys * ys
+        mask = d2 <= r * r
+        if node.outline:
+            mask &= d2 > (r - 1) * (r - 1)
+        return y0, x0, mask, self.color(node.color)
+
+    def sprite(self, node):
+        texture = node.texture
+        if texture is None:
+            return None
+        pixels = self.textures.get(id(texture))
+        if pixels is None:
+            values = np.frombuffer(bytes(texture.data), "<u2").reshape(texture.height, texture.width)
+            pixels = (values, rgb565_to_rgb(values.astype(np.int32)))
+            self.textures[id(texture)] = pixels
+        values, rgb = pixels
+
+        fw = texture.width // max(1, node.frame_count_x)
+        fh = texture.height // max(1, node.frame_count_y)
+        fx = (node.frame_current_x % max(1, node.frame_count_x)) * fw
+        fy = (node.frame_current_y % max(1, node.frame_count_y)) * fh
+
+        cx, cy = self.screen(node.position)
+        reach = math.hypot(fw, fh) / 2
+        y0, x0, xs, ys = self.grid(cx, cy, reach, reach)
+        c, s = math.cos(node.rotation), math.sin(node.rotation)
+        u = np.floor(xs * c - ys * s + fw / 2).astype(np.int32)
+        v = np.floor(xs * s + ys * c + fh / 2).astype(np.int32)
+        mask = (u >= 0) & (u < fw) & (v >= 0) & (v < fh)
+        u = np.clip(u, 0, fw - 1) + fx
+        v = np.clip(v, 0, fh - 1) + fy
+        if node.transparent_color is not None:
+            mask &= values[v, u] != node.transparent_color.value
+        return y0, x0, mask, rgb[v, u]
+
+    def text(self, node):
+        lines = str(node.text).split("\n")
+        if not any(lines):
+            return None
+        advance = GLYPH_WIDTH + node.letter_spacing
+        line_height = GLYPH_HEIGHT + node.line_spacing
+        w = max(len(line) for line in lines) * advance
+        h = len(lines) * line_height
+        cx, cy = self.screen(node.position)
+        y0, x0 = math.floor(cy - h / 2), math.floor(cx - w / 2)
+        mask = np.zeros((math.ceil(h) + 1, math.ceil(w) + 1), bool)
+        for row, line in enumerate(lines):
+            # Each line is centred on its own
+            indent = (w - len(line) * advance) / 2
+            top = round(row * line_height)
+            for col, char in enumerate(line):
+                if char == " ":
+                    continue
+                left = round(indent + col * advance)
+                mask[top:top + GLYPH_HEIGHT, left:left + GLYPH_WIDTH] = True
+        return y0, x0, mask, self.color(node.color)
+
+    def report(self):
+        frames = max(1, self.frames)
+        lines = [f"frames rendered: {self.frames}",
+                 f"mean fills per pixel: {self.overdraw_total.sum() / frames / self.width / self.height:.2f}",
+                 f"max fills on one pixel: {self.overdraw_total.max() / frames:.2f} per frame",
+                 "",
+                 "layer  fills/frame  hidden/frame  hidden %"]
+        for layer in range(LAYERS):
+            fills = self.layer_fills[layer] / frames
+            if fills == 0:
+                continue
+            hidden = self.layer_hidden[layer] / frames
+            lines.append(f"{layer:>5}  {fills:>11.0f}  {hidden:>12.0f}  {100 * hidden / fills:>7.1f}")
+        lines.append("")
+        lines.append("node type         draws/frame  fills/frame")
+        for kind in sorted(self.type_fills):
+            lines.append(f"{kind:<16}  {self.type_nodes[kind] / frames:>11.1f}  "
+                         f"{self.type_fills[kind] / frames:>11.0f}")
+        return "\n".join(lines)
+
+    def heatmap(self):
+        # Mean fills per pixel over every frame
+        return self.overdraw_total / max(1, self.frames)
+
+    def heatmap_ascii(self, step=4):
+        shades = " .:-=+*#%@"
+        heat = self.heatmap()
+        rows = []
+        for y in range(0, self.height, step):
+            row = ""
+            for x in range(0, self.width, step // 2):
+                value = heat[y:y + step, x:x + step // 2].mean()
+                row += shades[min(int(round(value)), len(shades) - 1)]
+            rows.append(row)
+        return "\n".join(rows)
+
+    def save_heatmap(self, path):
+        # Greyscale PGM, 255 is the busiest pixel
+        heat = self.heatmap()
+        scale = 255 / max(heat.max(), 1)
+        image = (heat * scale).astype(np.uint8)
+        with open(path, "wb") as f:
+            f.write(b"P5 %d %d 255\n" % (self.width, self.height))
+            f.write(image.tobytes())
+
+    def save_frame(self, path):
+        # PPM of the last frame rendered
+        image = (np.clip(self.framebuffer, 0, 1) * 255).astype(np.uint8)
+        with open(path, "wb") as f:
+            f.write(b"P6 %d %d 255\n" % (self.width, self.height))
+            f.write(image.tobytes())
@@ -0,0 +1,112 @@
+import argparse
+import os
+import random
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.abspath(os.path.join(HERE, "..", ".."))
+for path in (os.path.join(ROOT, "lib"), HERE):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import engine
+import engine_io
+import engine_resources
+import textures
+
+GAMES = ("Asteroids", "BitFlip", "FroggyRoad")
+
+
+def parse_script(text):
+    # "25:A,40:UP+LEFT:10" -> frame 25 press A, frame 40 hold UP and LEFT for 10 frames
+    held = {}
+    for item in filter(None, text.split(",")):
+        parts = item.strip().split(":")
+        start = int(parts[0])
+        length = int(parts[2]) if len(parts) > 2 else 1
+        for frame in range(start, start + length):
+            held.setdefault(frame, set()).update(parts[1].upper().split("+"))
+    return lambda frame: held.get(frame, ())
+
+
+def mash(seed, rate=0.15):
+    # Random button presses, each press held for 1-4 frames
+    rng = random.Random(seed)
+    names = [b.name for b in engine_io.BUTTONS if b.name != "MENU"]
+    held = {}
+
+    def source(frame):
+        if frame not in held:
+            if rng.random() < rate:
+                name = rng.choice(names)
+                for f in range(frame, frame + rng.randint(1, 4)):
+                    held.setdefault(f, set()).add(name)
+            held.setdefault(frame, set())
+        return held.pop(frame)
+    return source
+
+
+def run_game(name, frames, inputs=None, renderer=None, on_frame=None, seed=0):
+    """
+    Run a game's main.py headless for up to `frames` frames and return its
+    globals, so callers can inspect the game state afterwards.
+    """
+    engine.reset()
+    engine.max_frames = frames
+    engine.renderer = renderer
+    engine.on_frame = on_frame
+    engine_io.input_source = inputs
+    engine_resources.root = ROOT
+    textures.resolve = engine_resources.resolve
+    random.seed(seed)
+
+    path = os.path.join(ROOT, name, "main.py")
+    with open(path) as f:
+        code = compile(f.read(), path, "exec")
+    namespace = {"__name__": "__main__", "__file__": path}
+    if on_frame is not None:
+        # Let the hook see the game's globals while it runs
+        engine.on_frame = lambda frame: on_frame(frame, namespace)
+    try:
+        exec(code, namespace)
+    except engine.HeadlessExit:
+        pass
+    return namespace
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a game without the device.")
+    parser.add_argument("game", choices=GAMES)
+    parser.add_argument("--frames", type=int, default=500)
+    parser.add_argument("--script", default="",
+                        help="button presses, e.g. '25:A,40:UP+LEFT:10' (frame:buttons[:hold])")
+    parser.add_argument("--mash", type=int, metavar="SEED",
+                        help="press random buttons instead of following a script")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the game's random module")
+    parser.add_argument("--overdraw", action="store_true",
+                        help="rasterize every frame and report fills per layer and node type")
+    parser.add_argument("--heatmap", metavar="PGM", help="save the overdraw heatmap")
+    parser.add_argument("--frame", metavar="PPM", help="save the last rendered frame")
+    args = parser.parse_args()
+
+    inputs = mash(args.mash) if args.mash is not None else parse_script(args.script)
+    rasterizer = None
+    if args.overdraw or args.heatmap or args.frame:
+        from raster import Rasterizer
+        rasterizer = Rasterizer()
+
+    run_game(args.game, args.frames, inputs, renderer=rasterizer, seed=args.seed)
+    print(f"{args.game}: ran {engine.frame} frames")
+
+    if rasterizer is not None:
+        print(rasterizer.report())
+        print()
+        print(rasterizer.heatmap_ascii())
+        if args.heatmap:
+            rasterizer.save_heatmap(args.heatmap)
+        if args.frame:
+            rasterizer.save_frame(args.frame)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import argparse
+import os
+import random
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "headless"))
+
+import run # Sets up the paths to lib/ and the engine stand-in
+
+import engine
+import engine_animation
+import engine_nodes
+import nodeaudit
+
+# Plays each game headless through many restarts with lib/nodeaudit.py
+# installed, and fails if any node type leaks or keeps growing:
+#
+#     python tools/soak_nodes.py --restarts 300
+#
+# In the menu it presses A to start a game. While playing it presses random
+# buttons, weighted per game so the player dies quickly, and now and then
+# MENU to quit back to the menu.
+
+WEIGHTS = {
+    "Asteroids": {"UP": 6, "LEFT": 2, "RIGHT": 1, "A": 3, "B": 1, "MENU": 0.05},
+    "BitFlip": {"UP": 2, "DOWN": 2, "LEFT": 2, "RIGHT": 2, "A": 3, "B": 1, "MENU": 0.3},
+    "FroggyRoad": {"UP": 3, "LEFT": 1, "RIGHT": 1, "MENU": 0.05},
+}
+
+
+def in_menu(namespace):
+    menu = namespace.get("menu", True)
+    return menu.active if hasattr(menu, "active") else menu
+
+
+def player(game, seed):
+    # Returns an input source and the hook that lets it see the game's globals
+    rng = random.Random(seed)
+    names = list(WEIGHTS[game])
+    weights = [WEIGHTS[game][name] for name in names]
+    seen = {}
+
+    def source(frame):
+        namespace = seen.get("namespace")
+        if namespace is None or frame % 2:
+            return () # Every other frame nothing is held, so each press is a new press
+        if in_menu(namespace):
+            return ("A",)
+        return (rng.choices(names, weights)[0],)
+
+    def watch(frame, namespace, restarts, stats):
+        seen["namespace"] = namespace
+        stats["delays"] = max(stats["delays"], len(engine_animation.pending))
+        if nodeaudit.rounds.get("play", 0) > restarts:
+            raise engine.HeadlessExit(frame)
+    return source, watch
+
+
+def soak(game, restarts, frames, seed):
+    nodeaudit.reset()
+    stats = {"delays": 0}
+    source, watch = player(game, seed)
+    run.run_game(game, frames, source, seed=seed,
+                 on_frame=lambda frame, namespace: watch(frame, namespace, restarts, stats))
+    played = nodeaudit.rounds.get("play", 0)
+    print(f"{game}: {played} games in {engine.frame} frames, "
+          f"{len(engine_nodes.live)} nodes alive, at most {stats['delays']} delays pending")
+    print(nodeaudit.report())
+    print()
+    return not nodeaudit.problems() and played > restarts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Restart games many times and look for node leaks.")
+    parser.add_argument("games", nargs="*", help=f"games to soak (default: all of {', '.join(run.GAMES)})")
+    parser.add_argument("--restarts", type=int, default=200)
+    parser.add_argument("--frames", type=int, default=500000, help="give up after this many frames")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    for game in args.games:
+        if game not in run.GAMES:
+            parser.error(f"unknown game {game}")
+
+    nodeaudit.install()
+    ok = True
+    for game in args.games or run.GAMES:
+        ok = soak(game, args.restarts, args.frames, args.seed) and ok
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+import argparse
+import csv
+import errno
+import os
+import struct
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "lib"))
+
+from telemetry import FORMAT, MAGIC, SIZE
+
+# Reads the per-frame records written by lib/telemetry.py, from a file or a
+# serial port, and reports frame-time percentiles and spikes:
+#
+#     python tools/telemetry_report.py frames.bin
+#     python tools/telemetry_report.py /dev/ttyACM0 --csv frames.csv
+#
+# The stream is resynced on the magic and checksum, so it can be read from
+# the middle of a session or with console output mixed in. serve-pty replays
+# a recorded file through a pseudo-terminal, to try the serial path without
+# the device:
+#
+#     python tools/telemetry_report.py serve-pty frames.bin
+
+GAMES = {1: "Asteroids", 2: "BitFlip", 3: "FroggyRoad"}
+PHASES = {
+    1: ("movement", "collisions", "input"),
+    2: ("input", "-", "-"),
+    3: ("lanes", "collision", "hop and jobs"),
+}
+COUNTS = {
+    1: ("meteroids", "bullets", "-"),
+    2: ("unsolved", "-", "-"),
+    3: ("lane objects", "lane jobs", "-"),
+}
+FIELDS = ("seq", "frame_us", "phase0_us", "phase1_us", "phase2_us",
+          "count0", "count1", "count2", "game", "heap_free", "gc_events")
+MAGIC_BYTES = struct.pack("<H", MAGIC)
+
+
+def valid(record):
+    return sum(record[:SIZE - 1]) & 0xff == record[SIZE - 1]
+
+
+def parse(data):
+    # Returns (records, bytes skipped while resyncing, leftover partial record)
+    records = []
+    skipped = 0
+    i = 0
+    while i + SIZE <= len(data):
+        if data[i:i + 2] == MAGIC_BYTES and valid(data[i:i + SIZE]):
+            records.append(struct.unpack(FORMAT, data[i:i + SIZE - 1])[1:])
+            i += SIZE
+        else:
+            skipped += 1
+            i += 1
+    return records, skipped, data[i:]
+
+
+def open_stream(path):
+    fd = os.open(path, os.O_RDONLY | getattr(os, "O_NOCTTY", 0))
+    if os.isatty(fd):
+        import termios
+        import tty
+        tty.setraw(fd, termios.TCSANOW)
+    return fd
+
+
+def read_records(path):
+    # Reads until end of file, or until a serial port / pty goes away
+    fd = open_stream(path)
+    records = []
+    skipped = 0
+    pending = b""
+    try:
+        while True:
+            try:
+                chunk = os.read(fd, 4096)
+            except OSError as e:
+                if e.errno == errno.EIO: # The other end of the pty closed
+                    break
+                raise
+            if not chunk:
+                break
+            got, lost, pending = parse(pending + chunk)
+            records.extend(got)
+            skipped += lost
+    except KeyboardInterrupt:
+        pass
+    finally:
+        os.close(fd)
+    return records, skipped + len(pending)
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    if not ordered:
+        return 0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+def dropped(records):
+    lost = 0
+    for before, after in zip(records, records[1:]):
+        lost += (after[0] - before[0] - 1) & 0xffff
+    return lost
+
+
+def report(records, skipped, spike_factor):
+    game = records[-1][8]
+    phases = PHASES.get(game, ("phase 0", "phase 1", "phase 2"))
+    counts = COUNTS.get(game, ("count 0", "count 1", "count 2"))
+    lines = [f"{GAMES.get(game, game)}: {len(records)} frames, "
+             f"{dropped(records)} dropped, {skipped} bytes skipped"]
+
+    lines.append(f"{'':16} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8}")
+    columns = [("frame us", 1)] + [(phases[i] + " us", 2 + i) for i in range(3)]
+    columns += [(counts[i], 5 + i) for i in range(3)]
+    for name, column in columns:
+        if name.startswith("-"):
+            continue
+        values = [r[column] for r in records]
+        lines.append(f"{name:16} {percentile(values, 50):8} {percentile(values, 90):8} "
+                     f"{percentile(values, 99):8} {max(values):8}")
+
+    heap = [r[9] for r in records]
+    gc_total = (records[-1][10] - records[0][10]) & 0xff
+    lines.append(f"heap free {min(heap)}-{max(heap)} bytes, {gc_total} collections")
+
+    median = percentile([r[1] for r in records], 50)
+    limit = median * spike_factor
+    spikes = []
+    for i, r in enumerate(records):
+        if r[1] > limit:
+            collected = i > 0 and r[10] != records[i - 1][10]
+            worst = max(range(3), key=lambda p: r[2 + p])
+            spikes.append(f"  frame {r[0]:5}: {r[1]:7} us, mostly {phases[worst]}"
+                          + (", gc" if collected else ""))
+    lines.append(f"{len(spikes)} spikes over {spike_factor}x median ({median} us)")
+    lines.extend(spikes[:20])
+    if len(spikes) > 20:
+        lines.append(f"  ... {len(spikes) - 20} more")
+    return "\n".join(lines)
+
+
+def write_csv(records, path):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(FIELDS)
+        writer.writerows(records)
+
+
+def write_parquet(records, path):
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        sys.exit("--parquet needs pyarrow (pip install pyarrow)")
+    table = pyarrow.table({name: [r[i] for r in records] for i, name in enumerate(FIELDS)})
+    pyarrow.parquet.write_table(table, path)
+
+
+def serve_pty(path, rate):
+    # Replays a recording through a pty, `rate` records per second
+    import pty
+    import time
+    import tty
+    master, slave = pty.openpty()
+    tty.setraw(slave)
+    print(os.ttyname(slave), flush=True)
+    with open(path, "rb") as f:
+        data = f.read()
+    time.sleep(1) # Give the reader time to open it
+    for i in range(0, len(data), SIZE):
+        os.write(master, data[i:i + SIZE])
+        if rate:
+            time.sleep(1 / rate)
+    os.close(slave)
+    time.sleep(0.2)
+    os.close(master)
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "serve-pty":
+        parser = argparse.ArgumentParser(prog="telemetry_report.py serve-pty",
+                                         description="Replay a recording through a pty.")
+        parser.add_argument("recording")
+        parser.add_argument("--rate", type=float, default=0,
+                            help="records per second (default: as fast as possible)")
+        args = parser.parse_args(sys.argv[2:])
+        serve_pty(args.recording, args.rate)
+        return
+
+    parser = argparse.ArgumentParser(description="Summarise a telemetry stream.")
+    parser.add_argument("source", help="recorded file, serial port or pty")
+    parser.add_argument("--spike", type=float, default=2.0,
+                        help="report frames costing more than this times the median")
+    parser.add_argument("--csv", metavar="PATH", help="write every record as CSV")
+    parser.add_argument("--parquet", metavar="PATH", help="write every record as Parquet")
+    args = parser.parse_args()
+
+    records, skipped = read_records(args.source)
+    if not records:
+        sys.exit(f"no telemetry records in {args.source} ({skipped} bytes)")
+    print(report(records, skipped, args.spike))
+    if args.csv:
+        write_csv(records, args.csv)
+    if args.parquet:
+        write_parquet(records, args.parquet)
+
+
+if __name__ == "__main__":
+    main()